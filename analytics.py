@@ -0,0 +1,171 @@
+# -------------------- ANALYTICS --------------------
+# counts per label by hour of day / weekday, logging streaks and rolling
+# urge-spike rates over the calendar.
+#
+# Built once from the EventStore as columns (numpy), after that EventStore.apply
+# hands every change-set to .update so the counts move by +/-1 per event
+# instead of being recomputed. numpy/pandas are imported on first use, same as
+# the inference stack, so the calendar doesn't wait for them.
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+
+URGE_LABEL = "URGE SPIKE"
+ENTRY_LABEL = "Entry"
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def label_of(event) -> str:
+    # the old demo events only have a title ("URGE SPIKE"), the forms always set a label
+    return event.label or event.title or "Event"
+
+
+class EventAnalytics:
+    """Aggregates over a user's events, updated incrementally.
+
+    by_hour[code, hour] / by_weekday[code, weekday] are event counts, `labels[code]`
+    names the row, `_daily[code]` counts events per day (date ordinals). The
+    store hands listeners the old version of edited/deleted events, so taking
+    an event back out needs nothing remembered here.
+
+    Entries are stored in UTC, other events in local time; everything is
+    bucketed in local time (`tz`, or the server's zone if None) so an evening
+    check-in counts toward the day it was made.
+    """
+
+    def __init__(self, tz=None):
+        import numpy as np
+        self.tz = tz
+        self.labels = []
+        self._codes = {}
+        self.by_hour = np.zeros((0, 24), dtype=np.int64)
+        self.by_weekday = np.zeros((0, 7), dtype=np.int64)
+        self._daily = defaultdict(Counter)
+
+    def _start(self, event) -> datetime:
+        """When the event started, in local time"""
+        if event.utc:
+            return event.start.replace(tzinfo=timezone.utc).astimezone(self.tz).replace(tzinfo=None)
+        return event.start
+
+    def _today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    @classmethod
+    def from_events(cls, events, tz=None) -> "EventAnalytics":
+        """One vectorised pass over the whole store"""
+        import numpy as np
+        import pandas as pd
+        self = cls(tz)
+        # a repeating series is a schedule, not something that happened
+        events = [e for e in events if not e.rrule]
+        if not events:
+            return self
+        starts = [self._start(e) for e in events]
+        days = np.fromiter((d.toordinal() for d in starts), dtype=np.int64, count=len(starts))
+        hours = np.fromiter((d.hour for d in starts), dtype=np.int64, count=len(starts))
+        codes, names = pd.factorize(pd.Series([label_of(e) for e in events]))
+        weekdays = (days - 1) % 7  # ordinal 1 was a Monday
+
+        n = len(names)
+        self.labels = list(names)
+        self._codes = {name: code for code, name in enumerate(self.labels)}
+        self.by_hour = np.bincount(codes * 24 + hours, minlength=n * 24).reshape(n, 24)
+        self.by_weekday = np.bincount(codes * 7 + weekdays, minlength=n * 7).reshape(n, 7)
+        keys, counts = np.unique(days * n + codes, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self._daily[key % n][key // n] = count
+        return self
+
+    def __len__(self):
+        return int(self.by_hour.sum())
+
+    def _code(self, label: str) -> int:
+        import numpy as np
+        if label not in self._codes:
+            self._codes[label] = len(self.labels)
+            self.labels.append(label)
+            self.by_hour = np.vstack([self.by_hour, np.zeros((1, 24), dtype=np.int64)])
+            self.by_weekday = np.vstack([self.by_weekday, np.zeros((1, 7), dtype=np.int64)])
+        return self._codes[label]
+
+    def _count(self, event, step: int):
+        start = self._start(event)
+        code, day = self._code(label_of(event)), start.toordinal()
+        self.by_hour[code, start.hour] += step
+        self.by_weekday[code, start.weekday()] += step
+        daily = self._daily[code]
+        daily[day] += step
+        if not daily[day]:
+            del daily[day]
+
+    def update(self, removed=(), added=()):
+        """EventStore listener: take the old versions out, put the new ones in"""
+        for event in removed:
+            if not event.rrule:
+                self._count(event, -1)
+        for event in added:
+            if not event.rrule:
+                self._count(event, 1)
+
+    # ---- queries, all vectorised over labels x hours / days ----
+
+    def _active(self):
+        """Codes of labels that still have events"""
+        import numpy as np
+        return np.flatnonzero(self.by_hour.sum(axis=1))
+
+    def hour_table(self):
+        """DataFrame: one row per label, columns 0..23"""
+        import pandas as pd
+        active = self._active()
+        return pd.DataFrame(self.by_hour[active], index=[self.labels[c] for c in active], columns=range(24))
+
+    def weekday_table(self):
+        """DataFrame: one row per label, columns Mon..Sun"""
+        import pandas as pd
+        active = self._active()
+        return pd.DataFrame(self.by_weekday[active], index=[self.labels[c] for c in active], columns=WEEKDAYS)
+
+    def _daily_series(self, label: str, until: date = None):
+        """Events per day for a label (case-insensitive), every day from the first
+        one to the last (or `until`, if later) filled in"""
+        import numpy as np
+        import pandas as pd
+        counts = Counter()
+        for code, name in enumerate(self.labels):
+            if name.casefold() == label.casefold():
+                counts.update(self._daily[code])
+        if not counts:
+            return pd.Series(dtype=np.int64)
+        days = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        first = int(days.min())
+        last = max(int(days.max()), until.toordinal() if until else 0)
+        dense = np.zeros(last - first + 1, dtype=np.int64)
+        dense[days - first] = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        index = pd.date_range(date.fromordinal(first), periods=len(dense), freq="D")
+        return pd.Series(dense, index=index)
+
+    def streaks(self, label: str = ENTRY_LABEL, today: date = None) -> dict:
+        """Longest and current run of consecutive days with at least one `label` event.
+
+        The current streak still counts if today has nothing logged yet but yesterday does.
+        """
+        import numpy as np
+        daily = self._daily_series(label)
+        if daily.empty:
+            return {"current": 0, "longest": 0}
+        logged = daily.to_numpy() > 0
+        # run lengths: positions where a run of logged days starts / ends
+        edges = np.diff(np.concatenate([[0], logged.astype(np.int8), [0]]))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        last_day = daily.index[-1].date()
+        today = today or self._today()
+        current = int(ends[-1] - starts[-1]) if (today - last_day).days <= 1 else 0
+        return {"current": current, "longest": int((ends - starts).max())}
+
+    def urge_rate(self, window: int = 7, today: date = None):
+        """Rolling mean of urge spikes per day over `window` days, up to today"""
+        daily = self._daily_series(URGE_LABEL, until=today or self._today())
+        if daily.empty:
+            return daily.astype(float)
+        return daily.rolling(window, min_periods=1).mean()
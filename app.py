@@ -1,45 +1,319 @@
 import streamlit as st
-from difflib import get_close_matches
-import requests
-import random
+from streamlit.errors import StreamlitAPIException, StreamlitSecretNotFoundError
 import time
-import json
 # I'm having heart palpations rn haha
 import os
-from huggingface_hub import InferenceClient
+import random
 from streamlit_calendar import calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import uuid
-import pandas as pd
+import csv
+import functools
+import threading
+from zoneinfo import ZoneInfo
+# huggingface_hub only gets imported when the first chat message needs it (get_client)
 
-import pytz
-#tz = pytz.timezone("America/Toronto")
+from backends import ChatBackend, InferenceAPIBackend, LocalBackend
+from dispatcher import InferenceDispatcher
+from resilience import CircuitBreaker, LatencyTracker, hedged
+from prompts import SYSTEM_PROMPT, SUMMARY_PREFIX, SUMMARIZER_PROMPT, KNOWLEDGE_PREFIX
+from page_content import (CALENDAR_OPTIONS, CALENDAR_CSS, FEATURED_LINES, SKILL_OF_THE_DAY,
+                          ABOUT_CARDS, SIDEBAR_NOTES)
+from context import ConversationContext, count_tokens
+from skills import DBT_SKILLS, SkillMatcher
+from knowledge import SKILL_NOTES, KnowledgeIndex, reference
+from response_cache import ResponseCache, caching, is_general_question, make_key
+from chat_store import ChatHistory, SQLiteChatBackend, chat_markdown
+from event_store import Event, EventStore, SQLiteEventBackend, parse_calendar_date, sort_key
+from recurrence import Rule, RuleError
+from analytics import EventAnalytics
+from event_io import FORMATS, export_events, format_of, import_events
+from metrics import METRICS, timed
 
 # -------------------- TRYNG AI HERE --------------------
-os.environ["HF_TOKEN"] = st.secrets['HF_TOKEN']
 st.set_page_config(page_title="DBT Hub", page_icon="🐀", layout="wide")
 
+def setting(name: str, default=None):
+    """Look a knob up in .streamlit/secrets.toml first, then the environment"""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except StreamlitSecretNotFoundError:  # no secrets.toml at all
+        pass
+    return os.environ.get(name, default)
+
+CHAT_MODEL = setting("CHAT_MODEL", "HuggingFaceTB/SmolLM3-3B")
+
+# METRICS=on collects timings (off costs next to nothing); METRICS_PORT also
+# serves them as Prometheus text on that port
+METRICS.enabled = str(setting("METRICS", "off")).lower() in ("1", "on", "true", "yes")
+
+@st.cache_resource
+def start_metrics_server(port: int):
+    return METRICS.serve(port)
+
+if METRICS.enabled and setting("METRICS_PORT"):
+    start_metrics_server(int(setting("METRICS_PORT")))
+
+# per request, queueing included; also the HTTP timeout of the inference
+# clients so a hung provider call ends and gives its dispatcher slot back
+INFERENCE_TIMEOUT = float(setting("INFERENCE_TIMEOUT", 60))
+
 @st.cache_resource
 def get_client():
+    # imported and built on first use, so the calendar renders without waiting
+    # for the inference stack to load
+    from huggingface_hub import InferenceClient
+    # CHAT_BASE_URL points the client at any OpenAI-style endpoint instead,
+    # e.g. a local stub server when testing without the provider
+    if setting("CHAT_BASE_URL"):
+        return InferenceClient(base_url=setting("CHAT_BASE_URL"), api_key=setting("HF_TOKEN"),
+                               timeout=INFERENCE_TIMEOUT)
     return InferenceClient(
         provider="hf-inference",
-        api_key=os.environ["HF_TOKEN"]
+        api_key=setting("HF_TOKEN"),
+        timeout=INFERENCE_TIMEOUT
     )
-    
-client = get_client()
-
-# -------------------- SKILLS DATABASE --------------------
-# I need to take out this part w/out damaging anything
-DBT_SKILLS = {
-    "mindfulness": {
-        "keywords": ["mindful", "present moment", "observe"],
-        "response": "Let's practice mindfulness. Try focusing on your breath for 60 seconds..."
-    },
-    "distress_tolerance": {
-        "keywords": ["crisis", "distress", "urge"],
-        "response": "In moments of distress, try the TIPP skill..."
-    }
-}
+
+@st.cache_resource
+def get_backend() -> ChatBackend:
+    # CHAT_BACKEND = "hf-inference" (default) or "local"; the local model is
+    # loaded once per process and stays warm between turns and sessions
+    if setting("CHAT_BACKEND", "hf-inference") == "local":
+        return LocalBackend(
+            setting("LOCAL_MODEL_PATH", CHAT_MODEL),
+            quantization=setting("LOCAL_QUANTIZATION", "none"),
+            max_new_tokens=int(setting("LOCAL_MAX_NEW_TOKENS", 512))
+        )
+    return InferenceAPIBackend(get_client(), CHAT_MODEL)
+
+@st.cache_resource
+def get_dispatcher() -> InferenceDispatcher:
+    # shared by every session: caps concurrent model calls, queues the rest fairly
+    dispatcher = InferenceDispatcher(
+        get_backend(),
+        max_concurrency=int(setting("INFERENCE_CONCURRENCY", 4)),
+        timeout=INFERENCE_TIMEOUT
+    )
+    METRICS.collect("dispatcher", dispatcher.stats, backend="primary")
+    return dispatcher
+
+@st.cache_resource
+def get_hedge_dispatcher():
+    # HEDGE_MODEL (and optionally HEDGE_BASE_URL) name a second model/endpoint
+    # that gets the same request when the first one is slower than usual;
+    # unset means no hedging
+    if not (setting("HEDGE_MODEL") or setting("HEDGE_BASE_URL")):
+        return None
+    client = get_client()
+    if setting("HEDGE_BASE_URL"):
+        from huggingface_hub import InferenceClient
+        client = InferenceClient(base_url=setting("HEDGE_BASE_URL"), api_key=setting("HF_TOKEN"),
+                                 timeout=INFERENCE_TIMEOUT)
+    dispatcher = InferenceDispatcher(
+        InferenceAPIBackend(client, setting("HEDGE_MODEL", CHAT_MODEL)),
+        max_concurrency=int(setting("INFERENCE_CONCURRENCY", 4)),
+        timeout=INFERENCE_TIMEOUT
+    )
+    METRICS.collect("dispatcher", dispatcher.stats, backend="hedge")
+    return dispatcher
+
+@st.cache_resource
+def get_breaker() -> CircuitBreaker:
+    # process-wide: if the provider is down it's down for everyone
+    return CircuitBreaker(
+        failure_threshold=int(setting("BREAKER_FAILURES", 3)),
+        cooldown=float(setting("BREAKER_COOLDOWN", 30))
+    )
+
+@st.cache_resource
+def get_latency() -> LatencyTracker:
+    return LatencyTracker()
+
+REPLY_DEADLINE = float(setting("REPLY_DEADLINE", 15))
+
+def session_id() -> str:
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    return st.session_state.session_id
+
+@st.cache_resource
+def get_skill_matcher():
+    # compiled once per process, DBT_SKILLS is meant to grow a lot
+    return SkillMatcher(DBT_SKILLS, fuzzy=str(setting("SKILL_FUZZY", "true")).lower() == "true")
+
+@st.cache_resource
+def get_knowledge() -> KnowledgeIndex:
+    # built once per process, a search is a few dict lookups
+    return KnowledgeIndex(SKILL_NOTES)
+
+def skill_notes(prompt: str) -> str:
+    """The KNOWLEDGE_TOP_K notes that fit the prompt, ready to attach to it ("" if none do)"""
+    with METRICS.span("retrieval_seconds"):
+        snippets = get_knowledge().search(prompt, k=int(setting("KNOWLEDGE_TOP_K", 3)))
+    METRICS.observe("retrieved_notes", len(snippets))
+    return KNOWLEDGE_PREFIX + reference(snippets) if snippets else ""
+
+@st.cache_resource
+def get_response_cache():
+    # one cache for the whole process so every session benefits
+    cache = ResponseCache(
+        max_bytes=int(float(setting("RESPONSE_CACHE_MB", 16)) * 1024 * 1024),
+        ttl=float(setting("RESPONSE_CACHE_TTL", 6 * 3600))
+    )
+    METRICS.collect("response_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_event_backend():
+    # one connection for the whole process, sqlite handles the file locking
+    return SQLiteEventBackend(setting("EVENTS_DB", "dbt_hub.db"))
+
+@st.cache_resource
+def get_chat_backend():
+    # same file as the events by default, its own table and connection
+    return SQLiteChatBackend(setting("CHAT_DB", setting("EVENTS_DB", "dbt_hub.db")))
+
+CHAT_PAGE_SIZE = int(setting("CHAT_PAGE_SIZE", 30))
+
+def get_chat_history() -> ChatHistory:
+    """This user's chat log, newest page loaded; greets first-time users.
+
+    Anonymous visitors get a session-only log, nobody else can ever read it.
+    """
+    if "chat_history" not in st.session_state:
+        user = current_user()
+        history = ChatHistory(get_chat_backend() if user else None, user or "anonymous",
+                              page_size=CHAT_PAGE_SIZE)
+        if not len(history):
+            history.append("assistant", "Hello! I'm your DBT companion. How can I help?")
+        st.session_state.chat_history = history
+    return st.session_state.chat_history
+
+def current_user():
+    """Whose data this is: the signed-in account, or DBT_USER on a single-user install.
+
+    None for anonymous visitors: nothing they write is persisted, it lives in
+    their session only, so visitors never see each other's diary.
+    """
+    try:
+        if st.user.is_logged_in:
+            return st.user.email
+    except Exception:
+        pass
+    return setting("DBT_USER")
+
+CALENDAR_VIEWS = {"Month": "dayGridMonth", "Week": "timeGridWeek", "Day": "timeGridDay"}
+
+def calendar_range(view_type: str, day: date) -> dict:
+    """The view FullCalendar shows for `day` (weeks start on Sunday, months are 6 rows)"""
+    if view_type == "dayGridMonth":
+        current = day.replace(day=1)
+        start = current - timedelta(days=(current.weekday() + 1) % 7)
+        end = start + timedelta(weeks=6)
+    elif view_type == "timeGridWeek":
+        current = start = day - timedelta(days=(day.weekday() + 1) % 7)
+        end = start + timedelta(weeks=1)
+    else:
+        current = start = day
+        end = day + timedelta(days=1)
+    return {"type": view_type, "activeStart": start.isoformat(), "activeEnd": end.isoformat(),
+            "currentStart": current.isoformat()}
+
+def step_calendar(view: dict, direction: int) -> dict:
+    """One page back (-1) or forward (1) from `view`, like FullCalendar's prev/next"""
+    current = date.fromisoformat(view["currentStart"][:10])
+    if view["type"] == "dayGridMonth":
+        month = current.month - 1 + direction
+        current = current.replace(year=current.year + month // 12, month=month % 12 + 1)
+    else:
+        current += timedelta(days=(7 if view["type"] == "timeGridWeek" else 1) * direction)
+    return calendar_range(view["type"], current)
+
+def remount_calendar():
+    """New key for the calendar component: it comes back without its last
+    callback value, so nothing it reported before counts as handled anymore"""
+    st.session_state.calendar_key += 1
+    st.session_state.calendar_handled = None
+
+def move_calendar(view: dict):
+    """Point the calendar at `view` (FullCalendar only reads initialDate when it mounts)"""
+    st.session_state.calendar_view = view
+    remount_calendar()
+
+def calendar_window(view: dict) -> tuple:
+    """Visible range of the calendar, plus CALENDAR_PREFETCH_DAYS on each side if set.
+
+    All navigation goes through our own controls, so the view is always known
+    here and nothing needs sending ahead of time by default.
+    """
+    start = datetime.fromisoformat(sort_key(view["activeStart"]))
+    end = datetime.fromisoformat(sort_key(view["activeEnd"]))
+    margin = timedelta(days=int(setting("CALENDAR_PREFETCH_DAYS", 0)))
+    return (start - margin).isoformat(), (end + margin).isoformat()
+
+def hhmm(value: str) -> str:
+    """'HH:MM' of a FullCalendar date string ('00:00' for all-day dates)"""
+    return datetime.fromisoformat(value).strftime("%H:%M") if "T" in value else "00:00"
+
+REPEAT_OPTIONS = ["Never", "Daily", "Weekly", "ESM prompts"]
+ESM_PROMPT_MINUTES = int(setting("ESM_PROMPT_MINUTES", 15))
+
+def repeat_fields(repeat: str, start: datetime, end: datetime, weeks: int, per_day: int) -> dict:
+    """rrule (and for ESM, the single prompt's end) for a new repeating event.
+
+    For ESM prompts the start/end times are the window the prompts land in,
+    each prompt itself is ESM_PROMPT_MINUTES long.
+    """
+    until = datetime.combine(start.date() + timedelta(weeks=weeks, days=-1), datetime.max.time()).replace(microsecond=0)
+    if repeat != "ESM prompts":
+        return {"rrule": str(Rule(freq=repeat.upper(), until=until))}
+    prompt = timedelta(minutes=ESM_PROMPT_MINUTES)
+    rule = Rule(esm=per_day, window=(start.time(), (end - prompt).time()), until=until)
+    return {"rrule": str(rule), "end": (start + prompt).isoformat(timespec="seconds")}
+
+def label_choices(events: EventStore) -> list:
+    """Event and Entry, then every label already in use (the store asks the
+    backend's label index) and one just typed into "Add new label..." """
+    labels = ["Event", "Entry"] + [label for label in events.labels() if label not in ("Event", "Entry")]
+    if st.session_state.new_label and st.session_state.new_label not in labels:
+        labels.insert(1, st.session_state.new_label)
+    return labels
+
+def rerun_panel():
+    """Rerun just the fragment we're in; on a full script run that isn't allowed, so rerun everything"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def apply_calendar_changes(calendar_output, upserts=(), deletes=()):
+    """Apply one add/update/delete change-set from the Logs forms, then rerun once.
+
+    The calendar keeps its key, so the next run just hands FullCalendar the
+    changed window and it updates the events in place instead of remounting.
+    The output that opened the form is marked handled so it doesn't reopen it.
+    Cancel changes nothing, so there the calendar is remounted instead: that
+    clears its last click, and clicking the same thing again reopens the form.
+    """
+    events = st.session_state.calendar_events
+    if deletes:
+        action = "delete"
+    elif upserts:
+        first = upserts[0]
+        action = "edit" if (first.id if isinstance(first, Event) else first["id"]) in events else "add"
+    else:
+        action = "cancel"
+    with METRICS.span("form_handler_seconds", action=action):
+        if upserts or deletes:
+            events.apply(upserts, deletes)
+    if action == "cancel":
+        remount_calendar()
+    else:
+        st.session_state.calendar_handled = calendar_output
+    st.session_state.editing_event_id = None
+    rerun_panel()
+
 # -----------------------------------------------------------
 # general fallback responses
 GENERAL_RESPONSES = [
@@ -51,131 +325,287 @@ GENERAL_RESPONSES = [
 ]
 
 # -----------------------------------------------------------
-def generate_response(prompt: str, history: list) -> str:
-    """Generate AI response with guided personality"""
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a compassionate Dialectical Behavior Therapy (DBT) coach."
-                "You are a tool to teach DBT skills. When the user brings up a struggle,"
-                "you should recognize the pattern in the DBT and provide brief information"
-                "on the corresponding skill the user should refer to"
-                "Your responses should:\n"
-                "- sentence lengths can vary depending on the engagement of the user\n"
-                "- Use simple, empathetic language\n"
-                "- if the user poses the question in a forgein language, you reply in that language if you know it\n"
-                "- Focus on DBT skills when relevant, give in depth information about DBT skills in layman's terms\n"
-                "- Never give medical advice\n"
-                "- your name is Prongles but you don't need to give that information unless asked directly.\n"
-                "- Ask open-ended questions to encourage reflection\n"
-                'Example: "I hear you\'re feeling anxious. Would practicing paced breathing together help?"'
-            )
-        },
-        *[{"role": m["role"], "content": m["content"]} for m in history]
-    ]
-    
-    completion = client.chat.completions.create(
-        model="HuggingFaceTB/SmolLM3-3B",
-        messages=messages
-    )
-    return completion.choices[0].message.content
+def turn_summarizer():
+    """The context's summarizer: folds messages that scrolled out of the window
+    into the running summary with a model call. It runs on a background thread
+    without a script context, so everything it needs is resolved here."""
+    breaker, dispatcher, sid = get_breaker(), get_dispatcher(), session_id()
+    return functools.partial(summarize_turns, breaker, dispatcher, sid)
+
+def summarize_turns(breaker, dispatcher, sid, summary: str, messages: list, max_tokens: int) -> str:
+    # no point queueing behind a dead provider, the context falls back to
+    # the extractive summary when this raises
+    if breaker.state == "open":
+        raise RuntimeError("chat backend unavailable")
+
+    def request():
+        return dispatcher.submit(
+            sid,
+            [{
+                "role": "user",
+                "content": SUMMARIZER_PROMPT.format(
+                    max_words=max_tokens * 3 // 4,
+                    summary=summary or "(empty)",
+                    messages="\n".join(f"{m['role']}: {m['content']}" for m in messages)
+                )
+            }],
+            max_tokens=max_tokens,
+            batch=True  # nobody watches a summary stream in, it can share a batch
+        )
+
+    if dispatcher.max_batch > 1:
+        # a batched reply only arrives once the whole batch is generated, a
+        # first-token deadline would cut it off; the dispatcher timeout bounds it
+        return "".join(request()).strip()
+    return "".join(hedged(request, deadline=REPLY_DEADLINE)).strip()
+
+def get_context() -> ConversationContext:
+    if "context" not in st.session_state:
+        keep_turns = int(setting("CONTEXT_KEEP_TURNS", 6))
+        st.session_state.context = ConversationContext(
+            SYSTEM_PROMPT,
+            budget=int(setting("CONTEXT_TOKEN_BUDGET", 2048)),
+            keep_turns=keep_turns,
+            summarizer=turn_summarizer(),
+            summary_prefix=SUMMARY_PREFIX,
+            # picking up a stored conversation: the last few turns verbatim,
+            # not a summary of everything ever said
+            start=max(len(get_chat_history()) - keep_turns * 2, 0)
+        )
+    return st.session_state.context
+
+def fold_context(history: ChatHistory):
+    """Summarize turns that scrolled out of the window, after the reply and off
+    the script thread; the next turn uses the summary if it's done by then"""
+    context = get_context()
+    due = context.due(history)
+    if due:
+        threading.Thread(target=context.fold, args=due, name="context-fold", daemon=True).start()
 
-def get_dbt_response(user_input: str, history: list) -> str:
-    """Get response with priority: DBT skills > AI generation"""
+def local_reply(prompt: str) -> str:
+    """Instant reply that needs no model: closest skill, else a general prompt"""
+    matches = get_skill_matcher().match(prompt)
+    if matches:
+        return DBT_SKILLS[matches[0].skill]["response"]
+    return random.choice(GENERAL_RESPONSES)
+
+def general_messages(question: str, reference: str) -> list:
+    """System prompt + the question on its own, for answers shared through the cache.
+
+    Built here rather than by the session's ConversationContext: a one-message
+    history would look like a new chat to it and throw its summary away.
+    """
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": question + reference}]
+
+def generate_response(messages: list):
+    """Stream an AI response with guided personality, one chunk at a time.
+
+    The first token has to arrive within REPLY_DEADLINE; if the primary is
+    slower than the usual p95, the same request also goes to the hedge model
+    and whichever answers first wins.
+    """
+    # resolved up front, the lambdas run on worker threads without a script context
+    primary, hedge, sid = get_dispatcher(), get_hedge_dispatcher(), session_id()
+    start = time.perf_counter()
+    first = True
+    text = []
+    for chunk in hedged(
+        lambda: primary.submit(sid, messages),
+        (lambda: hedge.submit(sid, messages)) if hedge else None,
+        hedge_after=get_latency().percentile(0.95),
+        deadline=REPLY_DEADLINE
+    ):
+        if first:
+            ttft = time.perf_counter() - start
+            get_latency().record(ttft)
+            METRICS.observe("inference_ttft_seconds", ttft)
+            first = False
+        if METRICS.enabled:
+            text.append(chunk)
+        yield chunk
+    if METRICS.enabled:
+        METRICS.observe("inference_seconds", time.perf_counter() - start)
+        METRICS.observe("inference_tokens", count_tokens("".join(text)), kind="completion")
+        METRICS.observe("inference_tokens", sum(count_tokens(m["content"]) for m in messages), kind="prompt")
+
+def with_fallback(prompt: str, chunks):
+    """Run a model reply through the circuit breaker.
+
+    While the backend is unhealthy (or nothing arrives before the deadline)
+    the user gets local_reply instantly instead of a spinner.
+    """
+    breaker = get_breaker()
+    if not breaker.allow():
+        chunks.close()
+        METRICS.inc("inference_requests_total", outcome="breaker_open")
+        yield local_reply(prompt)
+        return
+    started = False
+    try:
+        for chunk in chunks:
+            started = True
+            yield chunk
+    except GeneratorExit:
+        breaker.release()
+        raise
+    except Exception as e:
+        breaker.record_failure()
+        METRICS.inc("inference_requests_total", outcome=type(e).__name__)
+        if started:
+            raise  # half a reply is already on screen, stream_reply handles it
+        yield local_reply(prompt)
+        return
+    finally:
+        chunks.close()
+    breaker.record_success()
+    METRICS.inc("inference_requests_total", outcome="ok")
+
+def get_dbt_response(user_input: str, history: list):
+    """Get response chunks with priority: DBT skills > AI generation"""
     user_input = user_input.lower()
     
     # Check for DBT keywords
-    for skill, data in DBT_SKILLS.items():
-        if any(keyword in user_input for keyword in data["keywords"]):
-            return data["response"]
+    matches = get_skill_matcher().match(user_input)
+    if matches:
+        METRICS.inc("replies_total", source="skill")
+        return iter([DBT_SKILLS[matches[0].skill]["response"]])
     
+    # General skill questions ("what is TIPP") get the same answer for everyone,
+    # so they are answered without the chat history and shared through the cache.
+    # Only ones that name a skill we have notes on, anything else (personal,
+    # or pointing back into the chat) always goes to the model with the full context.
+    notes = skill_notes(user_input)
+    if notes and is_general_question(user_input):
+        cache = get_response_cache()
+        key = make_key(user_input)
+        cached = cache.get(key)
+        if cached is not None:
+            METRICS.inc("replies_total", source="cache")
+            return iter([cached])
+        METRICS.inc("replies_total", source="model_general")
+        # fallback sits outside caching so canned replies never get cached
+        messages = general_messages(history[-1]["content"], notes)
+        return with_fallback(user_input, caching(generate_response(messages), cache, key))
+
     # Generate AI response if no DBT match
-    return generate_response(user_input, history)
+    METRICS.inc("replies_total", source="model")
+    messages = get_context().build(history, reference=notes)
+    return with_fallback(user_input, generate_response(messages))
 
+STREAM_ERROR_REPLY = "Sorry, I lost my train of thought there. Could you say that again?"
 
-# -----------------------------------------------------------
-tab1, tab2, tab3, tab4 = st.tabs(["Calendar", "Chat", "Featured", "About"])
+def stream_reply(chunks):
+    """Pass reply chunks through to st.write_stream.
 
-# okay so the calendar is the main tab, you enter your ESM + voluntary entries, these entried can have labels
+    The text so far is kept in st.session_state.pending_reply so a reply cut off
+    by a rerun (the user sending a new prompt) can still be saved. Timing and
+    errors are recorded by generate_response/with_fallback in METRICS.
+    """
+    st.session_state.pending_reply = ""
+    try:
+        for chunk in chunks:
+            st.session_state.pending_reply += chunk
+            yield chunk
+    except Exception:
+        # provider hiccup mid-stream: keep whatever arrived and tell the user,
+        # the saved reply gets the apology too so it reads the same on reload
+        apology = ("\n\n" if st.session_state.pending_reply else "") + STREAM_ERROR_REPLY
+        st.session_state.pending_reply += apology
+        yield apology
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
 
-# the chat part is to ask more about the skills ONLY, not where you write your problems smh
 
-with tab1:
+# Each panel is its own fragment: clicking around the calendar only reruns
+# calendar_panel, sending a chat message only reruns chat_panel, and so on.
+# A full script run only happens on first load.
+
+# okay so the calendar is the main tab, you enter your ESM + voluntary entries, these entried can have labels
+
+@st.fragment
+@timed("panel_seconds", panel="calendar")
+def calendar_panel():
+    # read-through cache: loaded from the event backend once per session, every
+    # change below goes through the EventStore which writes it to disk first.
+    # Anonymous visitors get a session-only store, like before persistence.
     if "calendar_events" not in st.session_state:
-        st.session_state.calendar_events = [
-            {"id": str(uuid.uuid4()), "title": "Past meeting", "start": "2025-08-01", "end": "2025-08-01", "color": "#FF6C6C"},
-            {"id": str(uuid.uuid4()), "title": "Meeting 1", "start": "2025-08-05T13:00:00", "end": "2025-08-05T14:00:00", "color": "#FF6C6C"},
-            {"id": str(uuid.uuid4()), "title": "URGE SPIKE", "start": "2025-08-05T16:00:00", "color": "#FFBD45"},
-        ]
+        user = current_user()
+        st.session_state.calendar_events = (
+            EventStore.load(get_event_backend(), user) if user else EventStore()
+        )
+        if not len(st.session_state.calendar_events):
+            st.session_state.calendar_events.apply(upserts=[
+                {"id": str(uuid.uuid4()), "title": "Past meeting", "start": "2025-08-01", "end": "2025-08-01", "color": "#FF6C6C"},
+                {"id": str(uuid.uuid4()), "title": "Meeting 1", "start": "2025-08-05T13:00:00", "end": "2025-08-05T14:00:00", "color": "#FF6C6C"},
+                {"id": str(uuid.uuid4()), "title": "URGE SPIKE", "start": "2025-08-05T16:00:00", "color": "#FFBD45"},
+            ])
+    events = st.session_state.calendar_events
     
     if "editing_event_id" not in st.session_state:
         st.session_state.editing_event_id = None
     if "new_label" not in st.session_state:
         st.session_state.new_label = ""
+    if "calendar_handled" not in st.session_state:
+        st.session_state.calendar_handled = None
     if "calendar_key" not in st.session_state:
         st.session_state.calendar_key = 0
+    if "calendar_view" not in st.session_state:
+        st.session_state.calendar_view = calendar_range("dayGridMonth", date.today())
 
-    # Calendar config
+    col1, col2 = st.columns([2, 1]) 
+    with col1:
+        view = st.session_state.calendar_view
+        nav = st.columns([1, 1, 1, 4])
+        if nav[0].button("Today", key="calendar_today"):
+            move_calendar(calendar_range(view["type"], date.today()))
+        if nav[1].button("‹", key="calendar_prev"):
+            move_calendar(step_calendar(view, -1))
+        if nav[2].button("›", key="calendar_next"):
+            move_calendar(step_calendar(view, 1))
+        names = list(CALENDAR_VIEWS)
+        shown = nav[3].radio("View", names, index=list(CALENDAR_VIEWS.values()).index(view["type"]),
+                             horizontal=True, label_visibility="collapsed")
+        if CALENDAR_VIEWS[shown] != view["type"]:
+            # stay on today if it's on screen, else on the page being looked at
+            today = date.today().isoformat()
+            anchor = today if view["activeStart"][:10] <= today < view["activeEnd"][:10] else view["currentStart"][:10]
+            move_calendar(calendar_range(CALENDAR_VIEWS[shown], date.fromisoformat(anchor)))
+
+    # the component is remounted whenever we navigate, initialDate puts it where we want
     calendar_options = {
-        "editable": True,
-        "selectable": True,
-        "selectMirror": True,
-        "selectHelper": True,
-        "selectOverlap": True,
-        "slotDuration": "00:15:00",
-        "slotMinTime": "00:00:00",
-        "slotMaxTime": "24:00:00",
-        "dateClick": True,
-        "headerToolbar": {
-            "left": "today prev,next",
-            "center": "title",
-            "right": "timeGridDay,timeGridWeek,dayGridMonth",
-        },
-        "initialView": "dayGridMonth",
-        "navLinks": True,
+        **CALENDAR_OPTIONS,
+        "initialView": st.session_state.calendar_view["type"],
+        "initialDate": st.session_state.calendar_view["currentStart"][:10],
     }
 
-    custom_css = """
-        .fc-event-title {
-            font-weight: 700;
-        }
-        .fc-toolbar-title {
-            font-size: 2rem;
-        }
-        .fc-event-past {
-            opacity: 0.5;
-        }
-        .fc-event-time {
-            font-style: italic;
-        }
-        .fc-entry-event {
-            background-color: white !important;
-            color: black !important;
-            border-color: white !important;
-        }
-    """
-
-    col1, col2 = st.columns([2, 1]) 
-    with col1: 
+    with col1:
+        # only the visible range goes to the browser, not the whole history
+        window_start, window_end = calendar_window(st.session_state.calendar_view)
         calendar_output = calendar(
-            events=st.session_state.calendar_events,
+            events=events.window_json(window_start, window_end),
             options=calendar_options,
-            custom_css=custom_css,
+            custom_css=CALENDAR_CSS,
+            # no eventsSet: it fires after every events update and would cost an
+            # extra rerun per edit, the view is already pinned by initialDate
+            callbacks=["dateClick", "eventClick", "eventChange", "select"],
             key=f"calendar_{st.session_state.calendar_key}"
         )
 
     with col2:
         st.subheader("Logs")
-        # Reset states when needed
-        if st.session_state.get("reset_calendar"):
-            st.session_state.calendar_key += 1
-            st.session_state.reset_calendar = False
-            st.rerun()
+        # The component keeps returning its last callback on every rerun. We used
+        # to remount it (new key) to clear that, now we just remember which
+        # output was already dealt with and ignore it after that. Only Cancel
+        # and navigating still remount it.
+        if calendar_output and calendar_output != st.session_state.calendar_handled:
+            fresh = calendar_output
+        else:
+            fresh = {}
 
         # Handle calendar interactions
-        if calendar_output and calendar_output.get("dateClick"):
-            clicked = calendar_output["dateClick"]
+        if fresh.get("dateClick"):
+            clicked = fresh["dateClick"]
             st.session_state.selected = {
                 "start": clicked["date"],
                 "end": clicked["date"],
@@ -183,8 +613,8 @@ with tab1:
             }
             st.session_state.editing_event_id = None
 
-        if calendar_output and calendar_output.get("select"):
-            selected = calendar_output["select"]
+        if fresh.get("select"):
+            selected = fresh["select"]
             st.session_state.selected = {
                 "start": selected["start"],
                 "end": selected["end"],
@@ -192,28 +622,40 @@ with tab1:
             }
             st.session_state.editing_event_id = None
 
-        if calendar_output and calendar_output.get("eventClick"):
-            clicked_event = calendar_output["eventClick"]["event"]
+        if fresh.get("eventClick"):
+            clicked_event = fresh["eventClick"]["event"]
             st.session_state.editing_event_id = clicked_event["id"]
-            st.session_state.selected_event = next(
-                (e for e in st.session_state.calendar_events if e["id"] == clicked_event["id"]),
-                None
-            )
-            st.rerun()
+            st.session_state.selected_event = events.get(clicked_event["id"])
+            # the edit form follows editing_event_id from here on
+            st.session_state.calendar_handled = calendar_output
+
+        # dragged/resized in the browser: it's already drawn there, just store it
+        if fresh.get("eventChange"):
+            moved = fresh["eventChange"]["event"]
+            if moved.get("id") in events:
+                start, all_day, utc = parse_calendar_date(moved["start"])
+                end = parse_calendar_date(moved["end"])[0] if moved.get("end") else None
+                with METRICS.span("form_handler_seconds", action="move"):
+                    events.apply(upserts=[events.updated(moved["id"], start=start, end=end, all_day=all_day, utc=utc)])
+            st.session_state.calendar_handled = calendar_output
+
+        # the event may have been deleted from another tab in the meantime
+        if st.session_state.editing_event_id not in events:
+            st.session_state.editing_event_id = None
 
         # Edit form
         if st.session_state.editing_event_id:
-            event_to_edit = next(
-                e for e in st.session_state.calendar_events 
-                if e["id"] == st.session_state.editing_event_id
-            )
+            event_to_edit = events.get(st.session_state.editing_event_id)
+            series_id = events.series_of(event_to_edit.id)
             
             with st.form(key="edit_event_form"):
                 st.subheader("Edit Event")
-                title = st.text_input("Event Title", value=event_to_edit.get("title", "Untitled Event"))
+                if series_id:
+                    st.caption("Part of a repeating series, changes here only apply to this one.")
+                title = st.text_input("Event Title", value=event_to_edit.title or "Untitled Event")
                 
                 # Only show color picker if not an entry
-                if event_to_edit.get("label") != "Entry":
+                if event_to_edit.label != "Entry":
                     color_options = {
                         "Red": "#FF6C6C",
                         "Orange": "#FFBD45",
@@ -221,7 +663,7 @@ with tab1:
                         "Blue": "#2196F3",
                         "Purple": "#9C27B0"
                     }
-                    current_color = event_to_edit.get("color", "#4CAF50")
+                    current_color = event_to_edit.color or "#4CAF50"
                     color_name = st.selectbox(
                         "Pick a color", 
                         list(color_options.keys()),
@@ -232,11 +674,9 @@ with tab1:
                     color = "#FFFFFF"
 
                 # Label selection with new label option
-                label_options = ["Event", "Entry"]
-                if st.session_state.new_label:
-                    label_options.insert(1, st.session_state.new_label)
+                label_options = label_choices(events)
                 
-                current_label = event_to_edit.get("label", "Event")
+                current_label = event_to_edit.label or "Event"
                 label = st.selectbox(
                     "Label",
                     label_options + ["Add new label..."],
@@ -247,7 +687,7 @@ with tab1:
                     new_label = st.text_input("New label name", key="new_label_input")
                     if new_label:
                         st.session_state.new_label = new_label
-                        st.rerun()
+                        rerun_panel()
                     label = st.session_state.new_label
 
                 # Time inputs if not an entry
@@ -255,13 +695,13 @@ with tab1:
                     col1, col2 = st.columns(2)
                     with col1:
                         start_time = st.text_input("Start Time", 
-                            value=pd.to_datetime(event_to_edit["start"]).strftime("%H:%M") 
-                            if "T" in event_to_edit["start"] else "00:00")
+                            value=event_to_edit.start.strftime("%H:%M") 
+                            if not event_to_edit.all_day else "00:00")
                     with col2:
                         end_time = st.text_input("End Time", 
-                            value=pd.to_datetime(event_to_edit["end"]).strftime("%H:%M") 
-                            if "T" in event_to_edit["end"] else "00:00")
-                details = st.text_area("Details", value=event_to_edit.get("details", ""))
+                            value=(event_to_edit.end or event_to_edit.start).strftime("%H:%M") 
+                            if not event_to_edit.all_day else "00:00")
+                details = st.text_area("Details", value=event_to_edit.details or "")
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -270,42 +710,35 @@ with tab1:
                     delete_clicked = st.form_submit_button("Delete")
                 with col3:
                     cancel_clicked = st.form_submit_button("Cancel")
+                delete_series_clicked = st.form_submit_button("Delete whole series") if series_id else False
                 
                 if save_clicked:
-                    event_to_edit.update({
-                        "title": title,
-                        "color": color,
-                        "label": label,
-                        "details": details
-                    })
-                    if label != "Entry":
-                        start_date = event_to_edit["start"].split("T")[0]
-                        end_date = event_to_edit["end"].split("T")[0]
-                        event_to_edit["start"] = f"{start_date}T{start_time}:00"
-                        event_to_edit["end"] = f"{end_date}T{end_time}:00"
-                    st.session_state.calendar_key += 1
-                    st.session_state.editing_event_id = None
-                    st.session_state.reset_calendar = True
-                    st.rerun()
+                    changes = {"title": title, "color": color, "label": label, "details": details}
+                    try:
+                        if label != "Entry":
+                            start = datetime.strptime(start_time, "%H:%M").time()
+                            end = datetime.strptime(end_time, "%H:%M").time()
+                            changes.update(
+                                start=datetime.combine(event_to_edit.start.date(), start),
+                                end=datetime.combine((event_to_edit.end or event_to_edit.start).date(), end),
+                                all_day=False
+                            )
+                        apply_calendar_changes(calendar_output, upserts=[events.updated(event_to_edit.id, **changes)])
+                    except ValueError:
+                        st.error("Please enter time in HH:MM format")
                 
                 if delete_clicked:
-                    st.session_state.calendar_events = [
-                        e for e in st.session_state.calendar_events 
-                        if e["id"] != st.session_state.editing_event_id
-                    ]
-                    st.session_state.calendar_key += 1
-                    st.session_state.editing_event_id = None
-                    st.session_state.reset_calendar = True
-                    st.rerun()
+                    apply_calendar_changes(calendar_output, deletes=[st.session_state.editing_event_id])
+
+                if delete_series_clicked:
+                    apply_calendar_changes(calendar_output, deletes=[series_id])
                 
                 if cancel_clicked:
-                    st.session_state.editing_event_id = None
-                    st.session_state.reset_calendar = True
-                    st.rerun()
+                    apply_calendar_changes(calendar_output)
 
         # Add event form
-        elif calendar_output and calendar_output.get("select"):
-            selected = calendar_output["select"]
+        elif fresh.get("select"):
+            selected = fresh["select"]
             with st.form(key="add_event_form"):
                 st.subheader("Add New Event")
                 
@@ -326,16 +759,22 @@ with tab1:
                     
                     col1, col2 = st.columns(2)
                     with col1:
-                        start_time = st.text_input("Start Time", value=pd.to_datetime(selected["start"]).strftime("%H:%M") if "T" in selected["start"] else "00:00")
+                        start_time = st.text_input("Start Time", value=hhmm(selected["start"]))
                     with col2:
-                        end_time = st.text_input("End Time", value=pd.to_datetime(selected["end"]).strftime("%H:%M") if "T" in selected["end"] else "00:00")
+                        end_time = st.text_input("End Time", value=hhmm(selected["end"]))
+
+                    repeat = st.selectbox("Repeat", REPEAT_OPTIONS)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        weeks = st.number_input("For how many weeks", min_value=1, max_value=520, value=8)
+                    with col2:
+                        per_day = st.number_input("ESM prompts a day", min_value=1, max_value=12, value=3)
+                    st.caption("ESM prompts land at random times between the start and end time.")
                 else:
                     color = "#FFFFFF"
                 
                 # Label selection for new events
-                label_options = ["Event", "Entry"]
-                if st.session_state.new_label:
-                    label_options.insert(1, st.session_state.new_label)
+                label_options = label_choices(events)
                 
                 label = st.selectbox(
                     "Label",
@@ -347,7 +786,7 @@ with tab1:
                     new_label = st.text_input("New label name", key="new_label_input_add")
                     if new_label:
                         st.session_state.new_label = new_label
-                        st.rerun()
+                        rerun_panel()
                     label = st.session_state.new_label
                 
                 details = st.text_area("Details")
@@ -373,10 +812,15 @@ with tab1:
                                 "label": label,
                                 "details": details
                             }
-                            st.session_state.calendar_events.append(new_event)
-                            st.session_state.calendar_key += 1
-                            st.session_state.reset_calendar = True
-                            st.rerun()
+                            if repeat != "Never":
+                                # one stored event for the whole schedule, occurrences are generated per view
+                                new_event.update(repeat_fields(
+                                    repeat, datetime.fromisoformat(new_event["start"]),
+                                    datetime.fromisoformat(new_event["end"]), int(weeks), int(per_day)
+                                ))
+                            apply_calendar_changes(calendar_output, upserts=[new_event])
+                        except RuleError as e:
+                            st.error(str(e))
                         except ValueError:
                             st.error("Please enter time in HH:MM format")
                     else:  # Entry
@@ -392,73 +836,153 @@ with tab1:
                             "details": details,
                             "className": "fc-entry-event"
                         }
-                        st.session_state.calendar_events.append(new_event)
-                        st.session_state.calendar_key += 1
-                        st.session_state.reset_calendar = True
-                        st.rerun()
+                        apply_calendar_changes(calendar_output, upserts=[new_event])
                 
                 if cancel_clicked:
-                    st.session_state.reset_calendar = True
-                    st.rerun()
-    
+                    apply_calendar_changes(calendar_output)
 
-with tab2:
-    if "messages" not in st.session_state:
-        st.session_state.messages = [
-            {"role": "assistant", "content": "Hello! I'm your DBT companion. How can I help?"}
-        ]
+    with st.expander("Import / export"):
+        transfer_view(events)
+
+    # only built (and then kept up to date by the store) once someone opens it
+    if st.toggle("Insights", key="show_insights"):
+        insights_view(events)
+
+def transfer_view(events: EventStore):
+    upload = st.file_uploader("Import events", type=["ics", "csv", "jsonl"], key="import_file")
+    if upload is not None and st.button("Import", key="import_go"):
+        try:
+            with METRICS.span("form_handler_seconds", action="import"):
+                st.session_state.import_report = import_events(events, upload, format_of(upload.name))
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            st.error(f"Couldn't read {upload.name}: {e}")
+        else:
+            rerun_panel()  # one calendar refresh for the whole file
+
+    report = st.session_state.get("import_report")
+    if report is not None:
+        st.success(f"Imported {report.imported} events")
+        if report.failed:
+            st.warning(f"{report.failed} rows skipped")
+            st.dataframe(
+                [{"row": number, "problem": message} for number, message in report.errors],
+                hide_index=True
+            )
+
+    # the file only gets built when asked for, not on every rerun
+    fmt = st.selectbox("Export as", FORMATS, key="export_format")
+    if st.button("Prepare export", key="export_go"):
+        st.session_state.export_file = (fmt, "".join(export_events(events, fmt)).encode())
+    if st.session_state.get("export_file"):
+        fmt, data = st.session_state.export_file
+        st.download_button(f"Download events.{fmt}", data, file_name=f"events.{fmt}")
+
+def get_analytics(events: EventStore) -> EventAnalytics:
+    if "calendar_analytics" not in st.session_state:
+        # TIMEZONE (e.g. "America/Toronto") is where the days start and end,
+        # unset means the server's own zone
+        tz = ZoneInfo(setting("TIMEZONE")) if setting("TIMEZONE") else None
+        # the one slow render: the store only has the calendar window so far,
+        # this pulls the whole history off disk (~2 s at 100k events, see
+        # benchmarks/bench_analytics.py), every render after that is ~ms
+        analytics = EventAnalytics.from_events(events, tz=tz)
+        events.listeners.append(analytics.update)
+        st.session_state.calendar_analytics = analytics
+    return st.session_state.calendar_analytics
+
+def insights_view(events: EventStore):
+    analytics = get_analytics(events)
+    if not len(analytics):
+        st.info("Nothing logged yet")
+        return
+    streak = analytics.streaks()
+    rate = analytics.urge_rate()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Entry streak", f"{streak['current']} days")
+    col2.metric("Longest streak", f"{streak['longest']} days")
+    col3.metric("Urge spikes / day (7-day avg)", f"{rate.iloc[-1]:.1f}" if len(rate) else "–")
+    st.caption("By hour of day")
+    st.bar_chart(analytics.hour_table().T)
+    st.caption("By weekday")
+    st.dataframe(analytics.weekday_table())
+    if len(rate):
+        st.caption("Urge spikes per day, 7-day rolling mean")
+        st.line_chart(rate.tail(180))
+
+# the chat part is to ask more about the skills ONLY, not where you write your problems smh
+
+@st.fragment
+@timed("panel_seconds", panel="chat")
+def chat_panel():
+    history = get_chat_history()
+
+    # A reply still streaming when the user sent a new prompt got cut off by the rerun,
+    # save what we had so the history stays in order
+    if st.session_state.get("pending_reply") is not None:
+        partial = st.session_state.pending_reply
+        st.session_state.pending_reply = None
+        if partial:
+            history.append("assistant", partial + " …")
+
+    # Only the newest pages are drawn, so a rerun costs the same at 10 messages
+    # or 10,000; older ones come in a page at a time on request
+    shown = st.session_state.setdefault("chat_shown", CHAT_PAGE_SIZE)
+    if len(history) > shown:
+        if st.button(f"Load earlier messages ({len(history) - shown} more)", key="chat_load_earlier"):
+            shown = st.session_state.chat_shown = shown + CHAT_PAGE_SIZE
 
     # Display chat history
-    for msg in st.session_state.messages:
-        st.chat_message(msg["role"]).write(msg["content"])
+    for msg in history.tail(shown):
+        st.chat_message(msg["role"]).markdown(chat_markdown(msg["id"], msg["content"]))
 
     # User input
     if prompt := st.chat_input("How are you feeling today?"):
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        history.append("user", prompt)
         st.chat_message("user").write(prompt)
         
-        with st.spinner("Thinking..."):
-            response = get_dbt_response(prompt, st.session_state.messages)
+        with st.chat_message("assistant"):
+            st.write_stream(stream_reply(get_dbt_response(prompt, history)))
         
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        st.chat_message("assistant").write(response)
+        response = st.session_state.pending_reply or STREAM_ERROR_REPLY
+        st.session_state.pending_reply = None
+        history.append("assistant", response)
+        fold_context(history)
 
-with tab3:
-    st.write("DBT resources and exercises will appear here")
-    st.write("Cute Ghosts on Drinking Straws by Kaboompics.com licensed under CC BY 4.0.")
+# -------------------- STATIC TABS --------------------
+# the content itself is in page_content.py, these just lay it out
 
-with tab4:
+@st.fragment
+@timed("panel_seconds", panel="featured")
+def featured_panel():
+    for line in FEATURED_LINES:
+        st.write(line)
+
+@st.fragment
+@timed("panel_seconds", panel="about")
+def about_panel():
     st.write("About this app and contact information")
     with st.container(border=True):  # 👈 Creates a bordered container
         col1, col2 = st.columns([1, 4])  # image column smaller than text
         with col1:
-            st.image("https://via.placeholder.com/60", width=60)  # small image
+            st.image(SKILL_OF_THE_DAY["image"], width=60)  # small image
         with col2:
-            st.markdown("**DBT Skill of the Day**  \nLearn how to use Opposite Action to fight emotional inertia.")
+            st.markdown(SKILL_OF_THE_DAY["text"])
         
-    with st.container(border=True):  # 👈 Creates a bordered container
-        st.markdown("""
-        **DBT zine!**  
-        [Check it out!](https://www.reddit.com/r/zines/comments/1m1r9ct/wip_dbt_zine/)
-        """)
-    with st.container(border=True):  # 👈 Creates a bordered container
-        st.markdown("""
-        **Will Wood - Marsha, Thankk You for the Dialectics, but I Need You to Leave (Official Lyric Video)**  
-        [Listen to it here!](https://www.youtube.com/watch?v=nyIKBT7-a9M&list=RDnyIKBT7-a9M&start_radio=1)
-        """)
+    for card in ABOUT_CARDS:
+        with st.container(border=True):  # 👈 Creates a bordered container
+            st.markdown(card)
 
 # -------------------- SIDEBAR --------------------
-with st.sidebar:
+@st.fragment
+@timed("panel_seconds", panel="sidebar")
+def sidebar_panel():
     st.header("Quick Access")
     st.button("Chain Analysis")
     st.button("Opposite Action")
     st.subheader("DBT notes")
-    with st.expander("Mindfulness"):
-        st.write(""" mindfullness of current emotions: experiencing emotions without 
-        necessarily acting on them => you can experience them without falling apart""")
-
-    with st.expander("Distress Tolerance"):
-        st.write("TIPP Skill: Temperature, Intense exercise...")
+    for title, note in SIDEBAR_NOTES.items():
+        with st.expander(title):
+            st.write(note)
     
         
     col_main, col_right = st.columns([2, 1])
@@ -474,6 +998,80 @@ with st.sidebar:
     #    st.markdown("Tip: Breathe in for 4 seconds...")
 
 
+# -------------------- METRICS ADMIN --------------------
+def metrics_admin() -> bool:
+    # METRICS_ADMINS = comma separated accounts. Unset, only the owner of a
+    # single-user install (DBT_USER) gets the panel; anonymous visitors never do
+    user = current_user()
+    if user is None:
+        return False
+    admins = setting("METRICS_ADMINS")
+    if not admins:
+        return user == setting("DBT_USER")
+    return user in [a.strip() for a in str(admins).split(",")]
+
+def fmt_metric(name: str, value: float) -> str:
+    if name.endswith("_rate"):
+        return f"{value:.0%}"
+    return f"{value * 1e3:.1f} ms" if name.endswith("_seconds") else f"{value:.0f}"
+
+@st.fragment
+def metrics_panel():
+    with st.expander("Metrics"):
+        rows = METRICS.snapshot()
+        replies = {r["labels"]["source"]: r["value"] for r in rows if r["name"] == "replies_total"}
+        if replies:
+            st.metric("Skill-match hit rate", f"{replies.get('skill', 0) / sum(replies.values()):.0%}")
+        cache = {r["name"]: r["value"] for r in rows if r["name"].startswith("response_cache_")}
+        if cache.get("response_cache_hits") or cache.get("response_cache_misses"):
+            st.metric("Response cache hit rate", fmt_metric("hit_rate", cache["response_cache_hit_rate"]))
+        st.dataframe(
+            [{
+                "metric": r["name"],
+                "labels": ", ".join(f"{k}={v}" for k, v in r["labels"].items()),
+                "count": r["count"],
+                "p50": fmt_metric(r["name"], r["p50"]),
+                "p95": fmt_metric(r["name"], r["p95"]),
+            } for r in rows if r["type"] == "histogram"],
+            hide_index=True
+        )
+        # counters, plus gauges straight from the dispatcher queue(s) and response cache
+        values = [r for r in rows if r["type"] in ("counter", "gauge")]
+        if values:
+            st.dataframe(
+                [{"metric": r["name"], "labels": ", ".join(f"{k}={v}" for k, v in r["labels"].items()),
+                  "value": fmt_metric(r["name"], r["value"])} for r in values],
+                hide_index=True
+            )
+        col1, col2 = st.columns(2)
+        col1.button("Refresh", key="metrics_refresh")
+        if col2.button("Reset", key="metrics_reset"):
+            METRICS.reset()
+            rerun_panel()
+        st.download_button("Prometheus text", METRICS.prometheus(), file_name="dbt_hub.prom")
+        st.download_button("JSONL", METRICS.jsonl(), file_name="dbt_hub_metrics.jsonl")
+
+# -----------------------------------------------------------
+tab1, tab2, tab3, tab4 = st.tabs(["Calendar", "Chat", "Featured", "About"])
+
+with tab1:
+    calendar_panel()
+
+with tab2:
+    chat_panel()
+
+with tab3:
+    featured_panel()
+
+with tab4:
+    about_panel()
+
+with st.sidebar:
+    sidebar_panel()
+    if METRICS.enabled and metrics_admin():
+        metrics_panel()
+
+
 # -------------------- UI EXTRA(TESTING BGS) --------------------
 #st.markdown(
 #    """
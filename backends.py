@@ -0,0 +1,172 @@
+# -------------------- CHAT BACKENDS --------------------
+# generate_response doesn't care where the words come from: the hosted
+# inference provider, or the model running right here on the CPU.
+# Which one is used is a setting (CHAT_BACKEND), see get_backend in app.py.
+import copy
+import threading
+
+
+class ChatBackend:
+    """Turns a chat message list into reply text"""
+
+    name = "base"
+    supports_batching = False
+
+    def stream(self, messages: list, max_tokens: int = None):
+        """Yield the reply in text chunks as they are generated"""
+        raise NotImplementedError
+
+    def complete(self, messages: list, max_tokens: int = None) -> str:
+        return "".join(self.stream(messages, max_tokens))
+
+    def complete_batch(self, batch: list, max_tokens: int = None) -> list:
+        """Replies for several message lists; only worth overriding if supports_batching"""
+        return [self.complete(messages, max_tokens) for messages in batch]
+
+
+class InferenceAPIBackend(ChatBackend):
+    """Chat completions through a huggingface_hub InferenceClient"""
+
+    name = "hf-inference"
+
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+
+    def stream(self, messages: list, max_tokens: int = None):
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # stop pulling from the provider if the chat tab walked away mid-reply
+            if hasattr(stream, "close"):
+                stream.close()
+
+    def complete(self, messages: list, max_tokens: int = None) -> str:
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens
+        )
+        return completion.choices[0].message.content
+
+
+class LocalBackend(ChatBackend):
+    """A causal LM checkpoint running in this process (made for SmolLM3 on CPU).
+
+    model_path can be a hub id or a local directory, so a tiny checkpoint on
+    disk is enough to try this without any network. quantization:
+      "none"  plain float32 (default)
+      "int8"  dynamic int8 Linear layers (torch.ao quantize_dynamic, which
+              newer torch releases deprecate, so it's opt-in and untested)
+      "4bit"  bitsandbytes NF4 (needs a bitsandbytes build with CPU support)
+    The key/value cache of the system prompt is computed once and copied into
+    every generation, so each turn only pays for the new messages.
+    """
+
+    name = "local"
+    supports_batching = True
+
+    def __init__(self, model_path: str, quantization: str = "none", max_new_tokens: int = 512):
+        # heavy imports stay in here, the hosted backend never needs them
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.max_new_tokens = max_new_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if quantization == "4bit":
+            from transformers import BitsAndBytesConfig
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                quantization_config=BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_quant_type="nf4"),
+                device_map="cpu"
+            )
+        else:
+            self.model = AutoModelForCausalLM.from_pretrained(model_path)
+            if quantization == "int8":
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+        self.model.eval()
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        # one generate at a time, they'd only fight over the same cores anyway
+        self._lock = threading.Lock()
+        self._prefix_ids = None
+        self._prefix_cache = None
+
+    def _tokens(self, messages: list, generation_prompt: bool):
+        return self.tokenizer.apply_chat_template(
+            messages, add_generation_prompt=generation_prompt, return_tensors="pt", return_dict=True
+        )["input_ids"]
+
+    def _cached_prefix(self, messages: list, input_ids):
+        """A fresh copy of the system prompt's KV cache, if input_ids starts with it"""
+        from transformers import DynamicCache
+
+        if not messages or messages[0]["role"] != "system":
+            return None
+        prefix_ids = self._tokens(messages[:1], generation_prompt=False)
+        n = prefix_ids.shape[1]
+        if n >= input_ids.shape[1] or not self.torch.equal(input_ids[0, :n], prefix_ids[0]):
+            return None  # chat template doesn't render the system block as a plain prefix
+        if self._prefix_ids is None or not self.torch.equal(self._prefix_ids, prefix_ids):
+            with self.torch.no_grad():
+                out = self.model(prefix_ids, past_key_values=DynamicCache(), use_cache=True)
+            self._prefix_ids, self._prefix_cache = prefix_ids, out.past_key_values
+        return copy.deepcopy(self._prefix_cache)
+
+    def stream(self, messages: list, max_tokens: int = None):
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        stop = threading.Event()
+
+        class Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return stop.is_set()
+
+        with self._lock:
+            input_ids = self._tokens(messages, generation_prompt=True)
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            kwargs = dict(
+                input_ids=input_ids,
+                attention_mask=self.torch.ones_like(input_ids),
+                max_new_tokens=max_tokens or self.max_new_tokens,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([Cancelled()]),
+            )
+            cache = self._cached_prefix(messages, input_ids)
+            if cache is not None:
+                kwargs["past_key_values"] = cache
+            worker = threading.Thread(target=self.model.generate, kwargs=kwargs, daemon=True)
+            worker.start()
+            try:
+                for text in streamer:
+                    if text:
+                        yield text
+            finally:
+                # the chat tab went away (new prompt, closed tab): stop generating
+                stop.set()
+                worker.join()
+
+    def complete_batch(self, batch: list, max_tokens: int = None) -> list:
+        """One generate() for several conversations (left padded), no prefix cache"""
+        texts = [self.tokenizer.apply_chat_template(m, add_generation_prompt=True, tokenize=False) for m in batch]
+        self.tokenizer.padding_side = "left"
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, add_special_tokens=False)
+        with self._lock, self.torch.no_grad():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max_tokens or self.max_new_tokens,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
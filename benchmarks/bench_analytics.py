@@ -0,0 +1,80 @@
+"""Insights dashboard cost at 10k / 100k events.
+
+Times the one-off columnar build, the per-edit incremental update (through
+EventStore listeners, no backend) against rebuilding the aggregates from
+scratch, and the queries the dashboard runs on every render.
+
+"first open ms" is what opening Insights the first time in a session really
+costs: the store only loads the calendar window on startup, so the whole
+history comes off SQLite and the aggregates get built right then. The
+renders after that are the "render ms" column.
+Run from the repo root: python benchmarks/bench_analytics.py
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from analytics import EventAnalytics  # noqa: E402
+from bench_event_store import make_events  # noqa: E402
+from event_store import EventStore, SQLiteEventBackend  # noqa: E402
+
+
+def ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def dashboard(analytics):
+    # what insights_view computes on every render
+    analytics.streaks()
+    analytics.urge_rate()
+    analytics.hour_table()
+    analytics.weekday_table()
+
+
+def first_open(backend):
+    # a new session's store, as get_analytics sees it on the first Insights render
+    analytics = EventAnalytics.from_events(EventStore.load(backend, "bench"))
+    dashboard(analytics)
+
+
+def main():
+    rng = random.Random(0)
+    # build ms is also what every edit would cost if the aggregates were recomputed
+    print(f"{'events':>7} {'first open ms':>14} {'build ms':>9} {'edit us':>8} {'render ms':>10}")
+    for n in (10_000, 100_000):
+        events = make_events(n, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteEventBackend(str(Path(tmp) / "events.db"))
+            backend.write_batch("bench", upserts=events)
+            first_open_ms = ms(lambda: first_open(backend), repeat=3)
+            backend.close()
+
+        store = EventStore(events=events)
+        build_ms = ms(lambda: EventAnalytics.from_events(store), repeat=3)
+
+        analytics = EventAnalytics.from_events(store)
+        store.listeners.append(analytics.update)
+        ids = rng.sample(list(store._by_id), 500)
+        start = time.perf_counter()
+        for event_id in ids:
+            store.apply(upserts=[store.updated(event_id, label="URGE SPIKE")])
+        edit_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+        render_ms = ms(lambda: dashboard(analytics))
+        print(f"{n:>7} {first_open_ms:>14.1f} {build_ms:>9.1f} {edit_us:>8.1f} {render_ms:>10.2f}")
+
+        check = EventAnalytics.from_events(store)
+        assert check.hour_table().sort_index().equals(analytics.hour_table().sort_index())
+
+
+if __name__ == "__main__":
+    main()
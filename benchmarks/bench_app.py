@@ -0,0 +1,302 @@
+"""Headless end-to-end benchmark of app.py.
+
+Drives the real script through Streamlit's AppTest with the inference client,
+the HF_TOKEN secret and the calendar component stubbed out, and scripts the
+user flows: calendar dateClick / select / add / edit / delete, and chat turns.
+Sweeps the number of stored events and the chat history length, and for every
+flow reports p50/p95 script-run time, peak Python memory (tracemalloc, one
+extra run) and the size of the event payload handed to the calendar.
+
+Results go to a JSON file; pass an older one with --compare to flag
+regressions (exits 1 if any p95 got more than --threshold worse).
+
+Run from the repo root:
+    python benchmarks/bench_app.py [--events 100,1000,10000,100000]
+        [--history 10,100,1000,10000] [--repeat 10] [--out bench_app.json]
+        [--compare old.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# the month the calendar is looking at, events are spread around it; same
+# shape as the app's st.session_state.calendar_view (see calendar_range)
+VIEW = {"type": "dayGridMonth", "activeStart": "2025-07-27", "activeEnd": "2025-09-07",
+        "currentStart": "2025-08-01"}
+REPLY = "It sounds like a lot happened today, want to walk through it together?"
+
+
+# -------------------- STUBS --------------------
+
+class FakeInferenceClient:
+    """Answers instantly so the numbers are the app's own overhead"""
+
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, **kwargs):
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=REPLY))])
+        return (
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+            for word in REPLY.split()
+        )
+
+
+SENT = {"bytes": 0}
+
+
+def fake_calendar(events=(), options=None, custom_css="", callbacks=None, license_key=None, key=None):
+    import streamlit as st
+    SENT["bytes"] = max(SENT["bytes"], len(json.dumps(events)))
+    return st.session_state.get("_bench_calendar", {})
+
+
+def install_stubs(db_path: str):
+    import huggingface_hub
+    import streamlit_calendar
+    huggingface_hub.InferenceClient = FakeInferenceClient
+    streamlit_calendar.calendar = fake_calendar
+    os.environ["EVENTS_DB"] = db_path
+
+
+# -------------------- DATA --------------------
+
+def seed(db_path: str, user: str, n: int, days: int, rng: random.Random):
+    from event_store import SQLiteEventBackend
+    base = datetime(2025, 8, 15) - timedelta(days=days // 2)
+    events = []
+    for i in range(n):
+        start = base + timedelta(minutes=rng.randrange(days * 24 * 60))
+        events.append({
+            "id": f"bench-{i}",
+            "title": f"event {i}",
+            "start": start.isoformat(timespec="seconds"),
+            "end": (start + timedelta(minutes=rng.choice([15, 30, 60]))).isoformat(timespec="seconds"),
+            "color": rng.choice(["#FF6C6C", "#FFBD45", "#4CAF50"]),
+            "label": rng.choice(["Event", "Entry", "URGE SPIKE"]),
+        })
+    backend = SQLiteEventBackend(db_path)
+    for i in range(0, n, 5000):
+        backend.write_batch(user, events[i:i + 5000])
+    backend.close()
+
+
+def seed_chat(db_path: str, user: str, length: int):
+    from chat_store import SQLiteChatBackend
+    backend = SQLiteChatBackend(db_path)
+    backend.append(user, [
+        {"id": uuid.uuid4().hex, "role": "user" if i % 2 else "assistant",
+         "content": f"message {i}: " + "some things that happened and how it felt " * 3}
+        for i in range(length)
+    ])
+    backend.close()
+
+
+def new_app():
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600)
+    at.secrets["HF_TOKEN"] = "bench"
+    return at
+
+
+# -------------------- FLOWS --------------------
+# each one sets up whatever it needs, then returns the seconds the measured
+# interaction took
+
+def run(at, action):
+    SENT["bytes"] = 0
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def calendar_output(at, callback, payload):
+    # a fresh id each time, the app ignores an output it has already handled
+    at.session_state["_bench_calendar"] = {"callback": callback, callback: payload, "bench": uuid.uuid4().hex}
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+
+
+def flow_idle(at, i):
+    return run(at, at.run)
+
+
+def flow_date_click(at, i):
+    calendar_output(at, "dateClick", {"date": f"2025-08-{10 + i % 10}", "allDay": True})
+    return run(at, at.run)
+
+
+def flow_select(at, i):
+    day = f"2025-08-{10 + i % 10}"
+    calendar_output(at, "select", {"start": f"{day}T10:00:00", "end": f"{day}T11:00:00", "allDay": False})
+    return run(at, at.run)
+
+
+def flow_add(at, i):
+    flow_select(at, i)
+    return run(at, lambda: click(at, "Add"))
+
+
+def open_editor(at):
+    events = at.session_state["calendar_events"]
+    shown = events.between(datetime(2025, 7, 27), datetime(2025, 9, 7))
+    event = shown[0] if shown else next(iter(events))
+    calendar_output(at, "eventClick", {"event": {"id": event.id}})
+    at.run()
+
+
+def flow_event_click(at, i):
+    return run(at, lambda: open_editor(at))
+
+
+def flow_edit(at, i):
+    open_editor(at)
+    return run(at, lambda: click(at, "Save Changes"))
+
+
+def flow_delete(at, i):
+    open_editor(at)
+    return run(at, lambda: click(at, "Delete"))
+
+
+def flow_chat_turn(at, i):
+    return run(at, lambda: at.chat_input[0].set_value(f"so anyway, about yesterday ({i})").run())
+
+
+CALENDAR_FLOWS = {
+    "idle": flow_idle, "dateClick": flow_date_click, "select": flow_select, "add": flow_add,
+    "eventClick": flow_event_click, "edit": flow_edit, "delete": flow_delete,
+}
+
+
+def measure(at, flow, repeat: int) -> dict:
+    times = [flow(at, i) for i in range(repeat)]
+    payload = SENT["bytes"]
+    tracemalloc.start()
+    flow(at, repeat)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    p95 = statistics.quantiles(times, n=20, method="inclusive")[18] if len(times) > 1 else times[0]
+    return {
+        "p50_ms": round(statistics.median(times) * 1e3, 2),
+        "p95_ms": round(p95 * 1e3, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "payload_kb": round(payload / 1024, 1),
+    }
+
+
+# -------------------- REPORT --------------------
+
+def meta(repeat: int) -> dict:
+    import streamlit
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        "commit": commit, "dirty": dirty, "when": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "streamlit": streamlit.__version__, "repeat": repeat,
+    }
+
+
+def key(row: dict) -> tuple:
+    return row["scenario"], row.get("events"), row.get("history"), row["flow"]
+
+
+def compare(results: dict, old_path: str, threshold: float) -> bool:
+    """Print p50/p95 against an older results file, True if anything regressed"""
+    with open(old_path) as f:
+        old = {key(row): row for row in json.load(f)["results"]}
+    regressed = False
+    print(f"\nvs {old_path}")
+    for row in results["results"]:
+        before = old.get(key(row))
+        if before is None:
+            continue
+        change = row["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        regressed |= bool(flag)
+        print(f"{row['scenario']:>8} {row.get('events') or row.get('history'):>7} {row['flow']:>10} "
+              f"p50 {before['p50_ms']:>8.1f} -> {row['p50_ms']:>8.1f}  "
+              f"p95 {before['p95_ms']:>8.1f} -> {row['p95_ms']:>8.1f} ({change:+.0%}){flag}")
+    return regressed
+
+
+def print_row(row: dict):
+    size = row.get("events") or row.get("history")
+    print(f"{row['scenario']:>8} {size:>7} {row['flow']:>10} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+          f"{row['peak_kb']:>9.0f} {row['payload_kb']:>10.1f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", default="100,1000,10000,100000")
+    parser.add_argument("--history", default="10,100,1000,10000")
+    parser.add_argument("--days", type=int, default=365, help="events are spread over this many days")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--out", default="bench_app.json")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = {"meta": meta(args.repeat), "results": []}
+    print(f"{'scenario':>8} {'size':>7} {'flow':>10} {'p50 ms':>8} {'p95 ms':>8} {'peak KB':>9} {'payload KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = f"{tmp}/bench.db"
+        install_stubs(db_path)
+
+        for n in map(int, args.events.split(",")):
+            os.environ["DBT_USER"] = f"bench-{n}"
+            seed(db_path, os.environ["DBT_USER"], n, args.days, rng)
+            at = new_app()
+            at.run()  # first load, not measured
+            at.session_state["calendar_view"] = dict(VIEW)
+            for name, flow in CALENDAR_FLOWS.items():
+                row = {"scenario": "calendar", "events": n, "flow": name, **measure(at, flow, args.repeat)}
+                results["results"].append(row)
+                print_row(row)
+
+        for length in map(int, args.history.split(",")):
+            os.environ["DBT_USER"] = f"bench-chat-{length}"
+            seed_chat(db_path, os.environ["DBT_USER"], length)
+            at = new_app()
+            at.run()
+            row = {"scenario": "chat", "history": length, "flow": "chat_turn",
+                   **measure(at, flow_chat_turn, args.repeat)}
+            results["results"].append(row)
+            print_row(row)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nwrote {args.out}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
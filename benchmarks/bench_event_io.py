@@ -0,0 +1,43 @@
+"""Bulk import/export of 100k events through EventStore + SQLite, per format.
+
+Exports a synthetic store, then imports the file into a fresh SQLite database
+(temp dir) twice: once new, once replacing every event. Run from the repo root:
+python benchmarks/bench_event_io.py
+"""
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_event_store import make_events  # noqa: E402
+from event_io import FORMATS, export_events, import_events  # noqa: E402
+from event_store import EventStore, SQLiteEventBackend  # noqa: E402
+
+
+def main(n=100_000):
+    source = EventStore(events=make_events(n, random.Random(0)))
+    print(f"{'format':>6} {'MB':>6} {'export s':>9} {'import s':>9} {'replace s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            start = time.perf_counter()
+            data = "".join(export_events(source, fmt)).encode()
+            export_s = time.perf_counter() - start
+
+            store = EventStore(SQLiteEventBackend(f"{tmp}/{fmt}.db"), user="bench")
+            start = time.perf_counter()
+            report = import_events(store, io.BytesIO(data), fmt)
+            import_s = time.perf_counter() - start
+            assert report.imported == n and not report.failed
+
+            start = time.perf_counter()
+            import_events(store, io.BytesIO(data), fmt)
+            replace_s = time.perf_counter() - start
+            print(f"{fmt:>6} {len(data) / 1e6:>6.1f} {export_s:>9.2f} {import_s:>9.2f} {replace_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
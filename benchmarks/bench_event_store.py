@@ -0,0 +1,109 @@
+"""Event lookup / edit / delete: the old list of dicts vs. EventStore.
+
+The list side does what app.py used to do (next(...) scans, rebuilding the
+list on delete, re-parsing ISO strings for the edit form). Memory only, no
+backend. Run from the repo root: python benchmarks/bench_event_store.py
+"""
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from event_store import EventStore  # noqa: E402
+
+LABELS = ["Event", "Entry", "URGE SPIKE", "therapy", "skills group"]
+COLORS = ["#FF6C6C", "#FFBD45", "#4CAF50", "#2196F3", "#9C27B0"]
+
+
+def make_events(n, rng):
+    base = datetime(2020, 1, 1)
+    events = []
+    for i in range(n):
+        start = base + timedelta(minutes=rng.randrange(6 * 365 * 24 * 60))
+        events.append({
+            "id": f"ev-{i}",
+            "title": f"event {i}",
+            "start": start.isoformat(timespec="seconds"),
+            "end": (start + timedelta(minutes=rng.choice([15, 30, 60]))).isoformat(timespec="seconds"),
+            "color": rng.choice(COLORS),
+            "label": rng.choice(LABELS),
+        })
+    return events
+
+
+def timed(fn, ids):
+    start = time.perf_counter()
+    for event_id in ids:
+        fn(event_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def bench_list(events, ids):
+    def lookup(event_id):
+        e = next(e for e in events if e["id"] == event_id)
+        datetime.fromisoformat(e["start"]).strftime("%H:%M")
+
+    def edit(event_id):
+        e = next(e for e in events if e["id"] == event_id)
+        e["title"] = "edited"
+
+    state = {"events": list(events)}
+
+    def delete(event_id):
+        state["events"] = [e for e in state["events"] if e["id"] != event_id]
+
+    return timed(lookup, ids), timed(edit, ids), timed(delete, ids)
+
+
+def bench_store(store, ids):
+    def lookup(event_id):
+        store.get(event_id).start.strftime("%H:%M")
+
+    def edit(event_id):
+        store.apply(upserts=[store.updated(event_id, title="edited")])
+
+    def delete(event_id):
+        store.apply(deletes=[event_id])
+
+    return timed(lookup, ids), timed(edit, ids), timed(delete, ids)
+
+
+def size_of(build):
+    """Build from freshly decoded JSON so both sides pay for their own strings"""
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size / 1e6
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'events':>7} {'':>6} {'lookup us':>10} {'edit us':>9} {'delete us':>10} {'window ms':>10} {'MB':>7}")
+    for n in (10_000, 100_000):
+        raw = make_events(n, rng)
+        ids = [e["id"] for e in rng.sample(raw, 200)]
+        window = (datetime(2023, 3, 1), datetime(2023, 4, 12))
+
+        blob = json.dumps(raw)
+        events, mb = size_of(lambda: json.loads(blob))
+        start = time.perf_counter()
+        [e for e in events if window[0].isoformat() <= e["start"] < window[1].isoformat()]
+        window_ms = (time.perf_counter() - start) * 1e3
+        print(f"{n:>7} {'list':>6} " + " ".join(f"{t:>9.1f}" for t in bench_list(events, ids))
+              + f" {window_ms:>10.2f} {mb:>7.1f}")
+
+        store, mb = size_of(lambda: EventStore(events=json.loads(blob)))
+        start = time.perf_counter()
+        store.window_json(window[0].isoformat(), window[1].isoformat())
+        window_ms = (time.perf_counter() - start) * 1e3
+        print(f"{n:>7} {'store':>6} " + " ".join(f"{t:>9.1f}" for t in bench_store(store, ids))
+              + f" {window_ms:>10.2f} {mb:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
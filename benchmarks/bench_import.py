@@ -0,0 +1,70 @@
+"""Cold-start profile of the app process.
+
+Each sample is a fresh interpreter that imports Streamlit's test harness and
+runs app.py once (that first run is what a new server process pays before the
+first page shows). Also lists which heavy modules the first run pulled in,
+and the top self-import times from `python -X importtime`.
+
+Run from the repo root: python benchmarks/bench_import.py [samples]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("pandas", "numpy", "huggingface_hub", "requests", "pytz", "torch", "transformers")
+
+FIRST_RUN = f"""
+import sys, time
+sys.path.insert(0, {str(ROOT)!r})
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({str(ROOT / "app.py")!r}, default_timeout=120)
+at.secrets["HF_TOKEN"] = "bench"
+at.run()
+print((time.perf_counter() - start) * 1e3)
+print(",".join(m for m in {HEAVY!r} if m in sys.modules))
+"""
+
+
+def first_run(env):
+    out = subprocess.run([sys.executable, "-c", FIRST_RUN], capture_output=True, text=True, env=env, cwd=ROOT)
+    lines = out.stdout.strip().splitlines()
+    if len(lines) < 2:
+        sys.exit(out.stderr)
+    return float(lines[-2]), lines[-1]
+
+
+def import_profile(env, top=12):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", FIRST_RUN],
+                         capture_output=True, text=True, env=env, cwd=ROOT)
+    rows = []
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if not name[1:].startswith(" "):  # top-level imports only
+                rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, EVENTS_DB=os.path.join(tmp, "bench.db"))
+        times, loaded = [], ""
+        for _ in range(samples):
+            ms, loaded = first_run(env)
+            times.append(ms)
+        print(f"first script run: median {statistics.median(times):.0f} ms "
+              f"(min {min(times):.0f}, max {max(times):.0f}, n={samples})")
+        print(f"heavy modules loaded by the first run: {loaded or 'none'}")
+        print("\nslowest imports (cumulative ms):")
+        for cumulative_us, name in import_profile(env):
+            print(f"  {cumulative_us / 1e3:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Skill-note retrieval: search latency and system-side prompt tokens per turn.
+
+Compares the fixed prompt app.py used to send (prompt text as of the commit
+before retrieval, inlined below) with the shorter prompt plus whatever notes
+the index attaches. Run from the repo root: python benchmarks/bench_knowledge.py
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from context import count_tokens  # noqa: E402
+from knowledge import SKILL_NOTES, KnowledgeIndex, reference  # noqa: E402
+from prompts import KNOWLEDGE_PREFIX, SYSTEM_PROMPT  # noqa: E402
+
+OLD_SYSTEM_PROMPT = (
+    "You are a compassionate Dialectical Behavior Therapy (DBT) coach."
+    "You are a tool to teach DBT skills. When the user brings up a struggle,"
+    "you should recognize the pattern in the DBT and provide brief information"
+    "on the corresponding skill the user should refer to"
+    "Your responses should:\n"
+    "- sentence lengths can vary depending on the engagement of the user\n"
+    "- Use simple, empathetic language\n"
+    "- if the user poses the question in a forgein language, you reply in that language if you know it\n"
+    "- Focus on DBT skills when relevant, give in depth information about DBT skills in layman's terms\n"
+    "- Never give medical advice\n"
+    "- your name is Prongles but you don't need to give that information unless asked directly.\n"
+    "- Ask open-ended questions to encourage reflection\n"
+    'Example: "I hear you\'re feeling anxious. Would practicing paced breathing together help?"'
+)
+
+PROMPTS = [
+    "I keep having this urge to text him and I don't know what to do",
+    "my boss yelled at me and I want to quit on the spot",
+    "how do I say no to my mom without a fight",
+    "im panicking and can't calm down",
+    "I can't sleep and I'm eating badly",
+    "so anyway, about yesterday",
+    "what is radical acceptance",
+    "hi how are you",
+]
+
+
+def main():
+    start = time.perf_counter()
+    index = KnowledgeIndex(SKILL_NOTES)
+    print(f"index: {len(SKILL_NOTES)} notes, {len(index.postings)} terms, built in "
+          f"{(time.perf_counter() - start) * 1e3:.2f} ms")
+    print(f"system prompt tokens: old {count_tokens(OLD_SYSTEM_PROMPT)}, new {count_tokens(SYSTEM_PROMPT)}\n")
+    print(f"{'prompt':<45} {'search us':>9} {'notes':>5} {'+tokens':>7}  skills")
+    for prompt in PROMPTS:
+        times = []
+        for _ in range(200):
+            start = time.perf_counter()
+            snippets = index.search(prompt)
+            times.append(time.perf_counter() - start)
+        extra = count_tokens(KNOWLEDGE_PREFIX + reference(snippets)) if snippets else 0
+        print(f"{prompt[:45]:<45} {statistics.median(times) * 1e6:>9.1f} {len(snippets):>5} {extra:>7}  "
+              + ", ".join(s.skill for s in snippets))
+
+
+if __name__ == "__main__":
+    main()
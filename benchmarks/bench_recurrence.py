@@ -0,0 +1,64 @@
+"""Cost of an ESM schedule (3 random prompts a day) against how long it runs.
+
+For 8 weeks up to 20 years, compares storing the schedule as one rule with
+storing every prompt as its own event: memory held by the EventStore, the first
+window_json of a month view (cold, expands the rule) and the same call again
+(memoised window).
+Run from the repo root: python benchmarks/bench_recurrence.py
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from event_store import EventStore  # noqa: E402
+from recurrence import Rule  # noqa: E402
+
+START = datetime(2025, 1, 6, 9)
+RULE = "FREQ=DAILY;X-ESM=3;X-WINDOW=0900-2045;X-GAP=30"
+# a month view plus a month on each side (calendar_window with CALENDAR_PREFETCH_DAYS=35)
+WINDOW = ("2025-01-05T00:00:00", "2025-04-13T00:00:00")
+
+
+def series(days: int) -> dict:
+    until = (START + timedelta(days=days - 1)).strftime("%Y%m%d")
+    return {"id": "esm", "title": "Check-in", "label": "ESM", "start": START.isoformat(),
+            "end": (START + timedelta(minutes=15)).isoformat(), "rrule": f"{RULE};UNTIL={until}"}
+
+
+def materialised(days: int) -> list:
+    rule = Rule.parse(series(days)["rrule"])
+    span = timedelta(minutes=15)
+    starts = rule.starts(START, span, START, START + timedelta(days=days), seed="esm")
+    return [{"id": f"esm-{i}", "title": "Check-in", "label": "ESM", "start": s.isoformat(),
+             "end": (s + span).isoformat()} for i, s in enumerate(starts)]
+
+
+def measure(events: list):
+    tracemalloc.start()
+    store = EventStore(events=events)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    shown = store.window_json(*WINDOW)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    store.window_json(*WINDOW)
+    warm = time.perf_counter() - start
+    return memory, cold, warm, len(shown)
+
+
+def main():
+    print(f"{'weeks':>6} {'prompts':>8} {'stored as':>10} {'store KB':>9} {'cold ms':>8} {'memo ms':>8} {'shown':>6}")
+    for weeks in (8, 52, 260, 1040):
+        days = weeks * 7
+        for name, events in (("rule", [series(days)]), ("events", materialised(days))):
+            memory, cold, warm, shown = measure(events)
+            print(f"{weeks:>6} {days * 3:>8} {name:>10} {memory / 1024:>9.1f} {cold * 1e3:>8.2f} "
+                  f"{warm * 1e3:>8.2f} {shown:>6}")
+
+
+if __name__ == "__main__":
+    main()
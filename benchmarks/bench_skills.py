@@ -0,0 +1,71 @@
+"""Skill matching time vs. size of the skill table.
+
+Compares the old linear `any(keyword in text ...)` scan with SkillMatcher on
+synthetic tables. Run from the repo root: python benchmarks/bench_skills.py
+"""
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from skills import DBT_SKILLS, SkillMatcher  # noqa: E402
+
+PROMPTS = [
+    "I keep having this urge to text him and I don't know what to do",
+    "can we practice being in the present moment for a bit",
+    "everything feels like a crisis at work lately and I'm exhausted",
+    "what's the weather like where you are",
+    "I tried to obsreve my thoughts but got distracted",
+]
+
+
+def fake_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+
+
+def make_table(n_skills, synonyms, rng):
+    table = dict(DBT_SKILLS)
+    for i in range(n_skills):
+        keywords = [fake_word(rng) for _ in range(synonyms)]
+        keywords += [f"{fake_word(rng)} {fake_word(rng)}" for _ in range(synonyms // 4)]
+        table[f"skill_{i}"] = {"keywords": keywords, "response": "..."}
+    return table
+
+
+def linear(table, text):
+    text = text.lower()
+    for name, data in table.items():
+        if any(keyword in text for keyword in data["keywords"]):
+            return name
+    return None
+
+
+def per_call_us(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for prompt in PROMPTS:
+            fn(prompt)
+    return (time.perf_counter() - start) / (repeat * len(PROMPTS)) * 1e6
+
+
+def main():
+    rng = random.Random(0)
+    # fuzzy column clears the typo cache every call, so it is the cold cost
+    print(f"{'skills':>7} {'keywords':>9} {'build ms':>9} {'linear us':>10} {'matcher us':>11} {'+fuzzy us':>10}")
+    for n_skills in (10, 100, 1000, 5000):
+        table = make_table(n_skills, 12, rng)
+        n_keywords = sum(len(d["keywords"]) for d in table.values())
+        start = time.perf_counter()
+        matcher = SkillMatcher(table, fuzzy=False)
+        build_ms = (time.perf_counter() - start) * 1e3
+        fuzzy = SkillMatcher(table, fuzzy=True)
+        print(f"{n_skills:>7} {n_keywords:>9} {build_ms:>9.1f} "
+              f"{per_call_us(lambda t: linear(table, t)):>10.1f} "
+              f"{per_call_us(matcher.match):>11.1f} "
+              f"{per_call_us(lambda t: fuzzy._closest.cache_clear() or fuzzy.match(t)):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# -------------------- CHAT HISTORY --------------------
+# chat messages used to live in st.session_state.messages, gone with the
+# session and re-rendered in full on every rerun. Now they're appended to a
+# per-user log on disk and a session only holds the newest page(s).
+import sqlite3
+import threading
+from functools import lru_cache
+import time
+import uuid
+
+
+class SQLiteChatBackend:
+    """Append-only message log per user in a SQLite file (WAL, one shared connection)"""
+
+    def __init__(self, path: str = "dbt_hub.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS messages_user_seq ON messages(user, seq)")
+
+    def append(self, user: str, messages: list):
+        """Write messages (dicts with id/role/content) in one transaction, filling in their seq"""
+        now = time.time()
+        with self._lock, self.conn:
+            for m in messages:
+                m["seq"] = self.conn.execute(
+                    "INSERT INTO messages (user, id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (user, m["id"], m["role"], m["content"], now)
+                ).lastrowid
+
+    def count(self, user: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM messages WHERE user = ?", (user,)).fetchone()[0]
+
+    def page(self, user: str, limit: int, before: int = None) -> list:
+        """Up to `limit` messages right before seq `before` (or the newest), oldest first"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, id, role, content FROM messages WHERE user = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (user, before if before is not None else 2 ** 63 - 1, limit)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class ChatHistory:
+    """One user's conversation, indexable like the list it replaces.
+
+    len() and indices cover the whole conversation, but only the newest pages
+    are in memory (`loaded`, starting at absolute index `start`); reaching
+    further back pulls earlier pages from the backend. Everything that only
+    looks at the tail (rendering, the context window) never touches the disk.
+    """
+
+    def __init__(self, backend: SQLiteChatBackend = None, user: str = "local", page_size: int = 50):
+        self.backend = backend
+        self.user = user
+        self.page_size = page_size
+        if backend is not None:
+            self.total = backend.count(user)
+            self.loaded = backend.page(user, page_size)
+        else:
+            self.total, self.loaded = 0, []
+        self.start = self.total - len(self.loaded)
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            first, stop, step = index.indices(self.total)
+            if first < stop:
+                self._reach(first)
+            return self.loaded[max(first - self.start, 0):max(stop - self.start, 0):step]
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("chat history index out of range")
+        self._reach(index)
+        return self.loaded[index - self.start]
+
+    def _reach(self, index: int):
+        while self.start > index and self.load_earlier():
+            pass
+
+    def load_earlier(self, pages: int = 1) -> bool:
+        """Pull older messages in front of what's loaded, False once nothing is left"""
+        if self.start <= 0 or self.backend is None:
+            return False
+        before = self.loaded[0]["seq"] if self.loaded else None
+        older = self.backend.page(self.user, self.page_size * pages, before)
+        if not older:
+            self.start = 0
+            return False
+        self.loaded[:0] = older
+        self.start -= len(older)
+        return True
+
+    def append(self, role: str, content: str) -> dict:
+        message = {"id": uuid.uuid4().hex, "role": role, "content": content}
+        if self.backend is not None:
+            self.backend.append(self.user, [message])
+        self.loaded.append(message)
+        self.total += 1
+        return message
+
+    def tail(self, n: int) -> list:
+        return self[max(self.total - n, 0):]
+
+
+@lru_cache(maxsize=4096)
+def chat_markdown(message_id: str, content: str) -> str:
+    """Message text as it goes to st.markdown, prepared once per message per process.
+
+    Dollar signs are escaped so "$20 and $30" isn't typeset as LaTeX, and
+    single newlines become line breaks like the user typed them. Lives here
+    and not in app.py because the app script is re-run (and its functions
+    re-created) on every rerun, which would start the cache over each time.
+    """
+    return content.replace("$", "\\$").replace("\n", "  \n")
@@ -0,0 +1,126 @@
+# -------------------- CONVERSATION CONTEXT --------------------
+# keeps what we send the model inside a token budget so long chats don't get
+# slower (and pricier) every turn: system prompt + last few turns verbatim,
+# everything older folded into a rolling summary
+import re
+import threading
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Rough token count (word pieces run ~4/3 per word for SmolLM-style tokenizers)"""
+    return (len(_TOKEN_RE.findall(text)) * 4 + 2) // 3
+
+
+def extractive_summary(summary: str, messages: list, max_tokens: int) -> str:
+    """Offline fallback: append the first sentence of each message, keep the newest part"""
+    lines = [summary] if summary else []
+    for m in messages:
+        first = re.split(r"(?<=[.!?])\s", m["content"].strip(), maxsplit=1)[0]
+        lines.append(f"{m['role']}: {first}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationContext:
+    """Builds the message list for each model call from the full chat history.
+
+    The summary only ever grows forward: messages that fall out of the verbatim
+    window are summarized once (together with the previous summary) and never
+    looked at again, so a long session costs the same per turn as a short one.
+    Summarizing is a model call of its own, so it isn't done while a turn is
+    being answered: `due` picks what should be folded and `fold` (run after
+    the reply, off the script thread) does it; a turn always goes out with the
+    last finished summary.
+    """
+
+    def __init__(self, system_prompt: str, budget: int = 2048, keep_turns: int = 6,
+                 summarizer=None, summary_prefix: str = "Earlier in this conversation:\n",
+                 start: int = 0):
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.keep_messages = keep_turns * 2  # a turn is a user message + the reply
+        self.summary_budget = budget // 4
+        self.summarizer = summarizer or extractive_summary
+        self.summary_prefix = summary_prefix
+        self.summary = ""
+        # how many history messages are already in the summary; a resumed
+        # conversation starts past the persisted messages it shouldn't re-read
+        self.summarized = start
+        self.folding = False
+        self._lock = threading.Lock()
+
+    def _reset_if_new(self, history: list):
+        if len(history) < self.summarized:
+            # history got reset (new chat), start over
+            self.summary, self.summarized = "", 0
+
+    def _trim(self, history: list, cut: int, reference: str = "") -> int:
+        """Move cut forward until the window fits the budget (the latest message always stays)"""
+        fixed = count_tokens(self.system_prompt) + count_tokens(reference) + self.summary_budget
+        recent = sum(count_tokens(m["content"]) for m in history[cut:])
+        while cut < len(history) - 1 and fixed + recent > self.budget:
+            recent -= count_tokens(history[cut]["content"])
+            cut += 1
+        return cut
+
+    def due(self, history: list) -> tuple:
+        """(first, cut, messages): history[first:cut] is ready to be folded, None if nothing is"""
+        with self._lock:
+            self._reset_if_new(history)
+            if self.folding:
+                return None  # the next fold picks these up too
+            # fold in batches of keep_turns turns instead of every turn, so the
+            # summarizer only runs every few turns
+            cut = self.summarized
+            if len(history) - cut > 2 * self.keep_messages:
+                cut = len(history) - self.keep_messages
+            # long messages can blow the budget even inside the window, push
+            # the oldest ones into the summary too
+            cut = self._trim(history, cut)
+            if cut <= self.summarized:
+                return None
+            self.folding = True
+            return self.summarized, cut, [{"role": m["role"], "content": m["content"]}
+                                          for m in history[self.summarized:cut]]
+
+    def fold(self, first: int, cut: int, messages: list):
+        """Summarize what `due` handed out; safe to run on any thread"""
+        try:
+            try:
+                summary = self.summarizer(self.summary, messages, self.summary_budget)
+            except Exception:
+                summary = extractive_summary(self.summary, messages, self.summary_budget)
+            with self._lock:
+                if self.summarized == first:  # not reset in the meantime
+                    self.summary, self.summarized = summary, cut
+        finally:
+            self.folding = False
+
+    def build(self, history: list, reference: str = "") -> list:
+        """Return [system, (summary), *recent] messages that fit the budget.
+
+        Everything after the summary goes in verbatim; only if that's over the
+        budget do the oldest messages sit this turn out (the next fold covers
+        them). `reference` (retrieved notes for this turn) is attached to the
+        latest message and the summary gets a system message of its own right
+        after the system prompt, so the system prompt stays the same from turn
+        to turn and chat to chat (LocalBackend caches it); both count against
+        the budget like everything else.
+        """
+        with self._lock:
+            self._reset_if_new(history)
+            summary, cut = self.summary, self.summarized
+        cut = self._trim(history, cut, reference)
+
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": self.summary_prefix + summary})
+        messages += [{"role": m["role"], "content": m["content"]} for m in history[cut:]]
+        if reference and len(messages) > 1:
+            messages[-1]["content"] += reference
+        return messages
@@ -0,0 +1,279 @@
+# -------------------- INFERENCE DISPATCHER --------------------
+# every session used to call the model on its own script thread: under load
+# that floods the provider, and a double-submitted prompt costs two calls.
+# All model calls now go through one dispatcher per process.
+import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+_DONE = object()
+
+
+class _Job:
+    __slots__ = ("key", "session", "messages", "max_tokens", "batch", "created", "started",
+                 "chunks", "subscribers", "done", "error", "cancelled")
+
+    def __init__(self, key, session, messages, max_tokens, batch=False):
+        self.key = key
+        self.session = session
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.batch = batch
+        self.created = time.monotonic()
+        self.started = None
+        self.chunks = []       # everything so far, replayed to late subscribers
+        self.subscribers = []  # queue.Queue per waiting reader
+        self.done = False
+        self.error = None
+        self.cancelled = False
+
+
+class InferenceDispatcher:
+    """Runs backend calls for every session, scheduled on one asyncio loop.
+
+    - at most `max_concurrency` calls run at once, the rest wait in per-session
+      queues served round-robin, so one busy session can't starve the others
+    - identical requests already queued or running are joined, not repeated
+    - each request has a deadline (`timeout`, queueing included); a backend call
+      still going at its deadline is abandoned and its slot given back
+    - if the backend supports_batching, waiting requests submitted with
+      batch=True are sent together as one complete_batch call (they arrive as a
+      single chunk each, once the whole batch is done). Chat replies leave it
+      off: they are read as a stream, with a deadline on the first chunk.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 4, timeout: float = 60.0,
+                 max_batch: int = 8, batch_window: float = 0.02):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_batch = max_batch if backend.supports_batching else 1
+        self.batch_window = batch_window
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # session -> deque of jobs, in round-robin order
+        self._inflight = {}           # key -> job, queued or running
+        self._running = 0
+        self._waits = deque(maxlen=1000)
+        self.counts = {"submitted": 0, "deduplicated": 0, "completed": 0,
+                       "failed": 0, "timeouts": 0, "cancelled": 0, "batches": 0, "abandoned": 0}
+
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._serve, args=(ready,), name="inference-dispatcher", daemon=True).start()
+        ready.wait()
+
+    # ---- session side (script threads) ----
+
+    def submit(self, session: str, messages: list, max_tokens: int = None, batch: bool = False):
+        """Queue a request and yield its reply chunks as they arrive"""
+        key = hashlib.sha1(json.dumps([messages, max_tokens], sort_keys=True).encode()).hexdigest()
+        inbox = queue.Queue()
+        with self._lock:
+            self.counts["submitted"] += 1
+            job = self._inflight.get(key)
+            if job is not None and not job.cancelled:
+                self.counts["deduplicated"] += 1
+            else:
+                job = _Job(key, session, messages, max_tokens, batch)
+                self._inflight[key] = job
+                self._queues.setdefault(session, deque()).append(job)
+            for chunk in job.chunks:
+                inbox.put(chunk)
+            job.subscribers.append(inbox)
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+        return self._read(job, inbox)
+
+    def _read(self, job, inbox):
+        deadline = job.created + self.timeout
+        try:
+            while True:
+                try:
+                    item = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    with self._lock:
+                        self.counts["timeouts"] += 1
+                    raise TimeoutError(f"no reply within {self.timeout:g}s")
+                if item is _DONE:
+                    if job.error is not None:
+                        raise job.error
+                    return
+                yield item
+        finally:
+            self._unsubscribe(job, inbox)
+
+    def _unsubscribe(self, job, inbox):
+        with self._lock:
+            if inbox in job.subscribers:
+                job.subscribers.remove(inbox)
+            if not job.subscribers and not job.done:
+                # nobody is reading anymore: drop it from the queue, or stop it mid-stream
+                job.cancelled = True
+                self.counts["cancelled"] += 1
+                self._inflight.pop(job.key, None)
+                pending = self._queues.get(job.session)
+                if pending and job in pending:
+                    pending.remove(job)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": sum(len(q) for q in self._queues.values()),
+                "sessions_waiting": sum(1 for q in self._queues.values() if q),
+                "running": self._running,
+                "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p95_seconds": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                **self.counts,
+            }
+
+    # ---- loop side ----
+
+    def _serve(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.loop.create_task(self._schedule())
+        ready.set()
+        self.loop.run_forever()
+
+    def _next_jobs(self, n: int) -> list:
+        """Up to n jobs, one per session per pass (round-robin).
+
+        A streamed (batch=False) job always runs on its own; once a batch has
+        started, sessions whose next job is streamed are passed over.
+        """
+        jobs = []
+        with self._lock:
+            taken = True
+            while len(jobs) < n and taken:
+                taken = False
+                for session in list(self._queues):
+                    pending = self._queues[session]
+                    if pending and len(jobs) < n and (not jobs or (jobs[0].batch and pending[0].batch)):
+                        jobs.append(pending.popleft())
+                        self._queues.move_to_end(session)
+                        taken = True
+                    if not pending:
+                        del self._queues[session]
+                if jobs and not jobs[0].batch:
+                    break
+        return jobs
+
+    async def _schedule(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                with self._lock:
+                    if not any(self._queues.values()):
+                        break
+                await self._slots.acquire()
+                if self.max_batch > 1:
+                    await asyncio.sleep(self.batch_window)  # let a batch fill up
+                jobs = self._next_jobs(self.max_batch)
+                if not jobs:
+                    self._slots.release()
+                    continue
+                self.loop.create_task(self._run(jobs))
+
+    async def _in_thread(self, fn, *args):
+        """fn(*args) on a daemon thread: unlike asyncio.to_thread's pool, a call
+        hung in the provider can't keep the process from exiting"""
+        future = self.loop.create_future()
+
+        def settle(result, error):
+            if not future.done():  # wait_for may have given up on it already
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        def work():
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+            self.loop.call_soon_threadsafe(settle, result, error)
+        threading.Thread(target=work, name="inference-call", daemon=True).start()
+        return await future
+
+    async def _run(self, jobs: list):
+        now = time.monotonic()
+        with self._lock:
+            self._running += 1
+            for job in jobs:
+                job.started = now
+                self._waits.append(now - job.created)
+        deadline = max(job.created for job in jobs) + self.timeout
+        try:
+            if len(jobs) == 1:
+                call = self._in_thread(self._stream, jobs[0])
+            else:
+                call = self._in_thread(self._batch, jobs)
+            await asyncio.wait_for(call, max(0.0, deadline - now))
+        except asyncio.TimeoutError:
+            # every reader has timed out by now; the thread ends whenever the
+            # backend's own (HTTP) timeout fires, but the slot is free right away
+            with self._lock:
+                self.counts["abandoned"] += 1
+            for job in jobs:
+                self._finish(job, TimeoutError(f"no reply within {self.timeout:g}s"))
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def _publish(self, job, item):
+        with self._lock:
+            if job.done:
+                return  # abandoned at its deadline, whatever comes late goes nowhere
+            if item is _DONE:
+                job.done = True
+                self._inflight.pop(job.key, None)
+            else:
+                job.chunks.append(item)
+            for inbox in job.subscribers:
+                inbox.put(item)
+
+    def _finish(self, job, error=None):
+        with self._lock:
+            if job.done:
+                return
+            job.error = error
+            self.counts["failed" if error else "completed"] += 1
+        self._publish(job, _DONE)
+
+    def _stream(self, job):
+        stream = self.backend.stream(job.messages, job.max_tokens)
+        try:
+            for chunk in stream:
+                if job.cancelled or job.done or time.monotonic() > job.created + self.timeout:
+                    self._publish(job, _DONE)  # readers are gone or timed out already
+                    return
+                self._publish(job, chunk)
+            self._finish(job)
+        except Exception as e:
+            self._finish(job, e)
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+
+    def _batch(self, jobs: list):
+        with self._lock:
+            self.counts["batches"] += 1
+        live = [job for job in jobs if not job.cancelled]
+        try:
+            replies = self.backend.complete_batch(
+                [job.messages for job in live], max(job.max_tokens or 0 for job in live) or None
+            ) if live else []
+        except Exception as e:
+            for job in live:
+                self._finish(job, e)
+            return
+        for job, reply in zip(live, replies):
+            self._publish(job, reply)
+            self._finish(job)
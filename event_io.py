@@ -0,0 +1,267 @@
+# -------------------- IMPORT / EXPORT --------------------
+# moving years of diary data in and out of the calendar. Readers stream the
+# file line by line, rows get validated a chunk at a time and each chunk goes
+# to the EventStore as one change-set (one backend transaction), so memory
+# stays flat no matter how long the file is. Writers yield text pieces.
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone
+from itertools import islice
+from zoneinfo import ZoneInfo
+
+from event_store import Event, EventStore
+from recurrence import Rule
+
+FORMATS = ("ics", "csv", "jsonl")
+CSV_FIELDS = ["id", "title", "start", "end", "color", "label", "details", "className", "rrule", "exdate"]
+MAX_ERRORS = 100  # row errors kept for the report, the rest are only counted
+
+
+def format_of(filename: str) -> str:
+    ext = filename.rsplit(".", 1)[-1].lower()
+    return {"ndjson": "jsonl", "ical": "ics"}.get(ext, ext)
+
+
+# ---- readers: (row number, raw dict) ----
+
+def read_jsonl(lines):
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, e
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # empty cells mean "not set", not ""
+        row = {k: v for k, v in row.items() if k and v not in (None, "")}
+        if "exdate" in row:
+            row["exdate"] = row["exdate"].split(",")
+        yield reader.line_num, row
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return (text.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _ics_date(params: str, value: str) -> str:
+    """DTSTART/DTEND value -> ISO string parse_calendar_date understands"""
+    # sliced by hand, strptime is most of the import time on big calendars
+    if len(value) == 8:  # VALUE=DATE
+        return date(int(value[:4]), int(value[4:6]), int(value[6:])).isoformat()
+    if len(value) not in (15, 16) or value[8] != "T":
+        raise ValueError(f"not an iCalendar date-time: {value!r}")
+    dt = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                  int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):
+        return dt.isoformat() + "Z"
+    for param in params.split(";"):
+        if param.upper().startswith("TZID="):
+            try:
+                return dt.replace(tzinfo=ZoneInfo(param[5:].strip('"'))).isoformat()
+            except (KeyError, ValueError):
+                break  # unknown zone name: keep it as floating local time
+    return dt.isoformat()
+
+
+def _unfold(lines):
+    """Join RFC 5545 continuation lines, keeping the number of the first one"""
+    pending, start = None, 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield start, pending
+        pending, start = line, number
+    if pending is not None:
+        yield start, pending
+
+
+def read_ics(lines):
+    event, start = None, 0
+    for number, line in _unfold(lines):
+        name, _, value = line.partition(":")
+        name, _, params = name.partition(";")
+        name = name.upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event, start = {}, number
+        elif event is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            yield start, event
+            event = None
+        else:
+            try:
+                if name == "UID":
+                    event["id"] = value
+                elif name == "SUMMARY":
+                    event["title"] = _unescape(value)
+                elif name == "DESCRIPTION":
+                    event["details"] = _unescape(value)
+                elif name == "CATEGORIES":
+                    event["label"] = _unescape(value.split(",")[0])
+                elif name == "COLOR":
+                    event["color"] = value
+                elif name == "X-DBT-CLASSNAME":
+                    event["className"] = value
+                elif name == "DTSTART":
+                    event["start"] = _ics_date(params, value)
+                elif name == "DTEND":
+                    event["end"] = _ics_date(params, value)
+                elif name == "RRULE":
+                    event["rrule"] = value
+                elif name == "EXDATE":
+                    # stored as occurrence keys, which are floating YYYYMMDDTHHMMSS
+                    event.setdefault("exdate", []).extend(v[:15] for v in value.split(","))
+            except ValueError as e:
+                event["_error"] = f"{name}: {e}"
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "ics": read_ics}
+
+
+# ---- validation ----
+
+def to_event(row) -> Event:
+    """Raw row -> Event, ValueError with a readable message if it can't be one"""
+    if isinstance(row, Exception):
+        raise ValueError(f"not valid JSON ({row})")
+    if not isinstance(row, dict):
+        raise ValueError("expected an object")
+    if row.get("_error"):
+        raise ValueError(row["_error"])
+    if row.get("rrule"):
+        Rule.parse(row["rrule"])  # raises with what's wrong with it
+    if not row.get("start"):
+        raise ValueError("missing start")
+    row = dict(row)
+    row["id"] = str(row.get("id") or uuid.uuid4())
+    try:
+        event = Event.from_dict(row)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"bad date ({e})") from None
+    if event.end is not None and event.end < event.start:
+        raise ValueError("ends before it starts")
+    return event
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (row number, message), first MAX_ERRORS only
+
+    def error(self, number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((number, message))
+
+
+def import_events(store: EventStore, stream, fmt: str, chunk_size: int = 5000) -> ImportReport:
+    """Stream `stream` (text or binary file) into the store, chunk_size rows per change-set.
+
+    Rows with the same id as an existing event replace it, so importing the
+    same export twice doesn't duplicate anything.
+    """
+    if fmt not in READERS:
+        raise ValueError(f"can't import .{fmt} files, use one of {', '.join(FORMATS)}")
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    report = ImportReport()
+    rows = READERS[fmt](stream)
+    while chunk := list(islice(rows, chunk_size)):
+        upserts = {}
+        for number, row in chunk:
+            try:
+                event = to_event(row)
+            except ValueError as e:
+                report.error(number, str(e))
+                continue
+            upserts[event.id] = event  # last one wins inside a chunk too
+        store.apply(upserts=list(upserts.values()))
+        report.imported += len(upserts)
+    return report
+
+
+# ---- writers: yield text pieces ----
+
+def write_jsonl(events):
+    for event in events:
+        yield json.dumps(event.to_dict(), ensure_ascii=False) + "\n"
+
+
+def write_csv(events, chunk_size: int = 1000):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for i, event in enumerate(events, 1):
+        row = event.to_dict()
+        if "exdate" in row:
+            row["exdate"] = ",".join(row["exdate"])
+        writer.writerow(row)
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    # RFC 5545 wants lines under 75 octets, continuation lines start with a space
+    parts = [line[:73]] + [" " + line[i:i + 72] for i in range(73, len(line), 72)]
+    return "\r\n".join(parts) + "\r\n"
+
+
+def _ics_stamp(event: Event, dt: datetime) -> str:
+    if event.all_day:
+        return ";VALUE=DATE:" + dt.strftime("%Y%m%d")
+    return ":" + dt.strftime("%Y%m%dT%H%M%S") + ("Z" if event.utc else "")
+
+
+def write_ics(events):
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//DBT Hub//Calendar//EN\r\n"
+    for event in events:
+        lines = ["BEGIN:VEVENT", f"UID:{event.id}", f"DTSTAMP:{stamp}",
+                 "DTSTART" + _ics_stamp(event, event.start)]
+        if event.end is not None:
+            lines.append("DTEND" + _ics_stamp(event, event.end))
+        lines.append(f"SUMMARY:{_escape(event.title or '')}")
+        if event.details:
+            lines.append(f"DESCRIPTION:{_escape(event.details)}")
+        if event.label:
+            lines.append(f"CATEGORIES:{_escape(event.label)}")
+        if event.color:
+            lines.append(f"COLOR:{event.color}")
+        if event.class_name:
+            lines.append(f"X-DBT-CLASSNAME:{event.class_name}")
+        if event.rrule:
+            lines.append(f"RRULE:{event.rrule}")
+            if event.extra.get("exdate"):
+                lines.append("EXDATE:" + ",".join(k + ("Z" if event.utc else "") for k in event.extra["exdate"]))
+        lines.append("END:VEVENT")
+        yield "".join(_fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
+
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv, "ics": write_ics}
+
+
+def export_events(events, fmt: str):
+    """Text pieces of `events` in the given format"""
+    return WRITERS[fmt](events)
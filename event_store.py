@@ -0,0 +1,470 @@
+# -------------------- EVENT STORAGE --------------------
+# calendar events used to live only in st.session_state and vanished with the
+# session. Backends keep them on disk; the session list is just a cache on top.
+import bisect
+import heapq
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from operator import attrgetter
+
+from metrics import timed
+from recurrence import RULE_FIELDS, Rule, occurrence_id, split_id
+
+# FullCalendar fields that get their own column, anything else rides along in `extra`
+COLUMNS = {"id": "id", "title": "title", "start": "start_at", "end": "end_at",
+           "color": "color", "label": "label", "details": "details", "className": "class_name"}
+
+# events longer than this are flagged so range queries can stay on the (user, start) index
+LONG_EVENT = timedelta(days=7)
+
+
+def sort_key(value: str, end: bool = False) -> str:
+    """Comparable 'YYYY-MM-DDTHH:MM:SS' for any ISO string the calendar hands us"""
+    if not value:
+        return ""
+    if len(value) == 10:  # all-day date
+        return value + ("T23:59:59" if end else "T00:00:00")
+    return value[:19]
+
+
+def _parse(key: str) -> datetime:
+    return datetime.fromisoformat(key)
+
+
+class EventBackend:
+    """Somewhere to keep a user's events between sessions"""
+
+    def load(self, user: str, start: str = None, end: str = None) -> list:
+        """All of a user's events, or the ones overlapping [start, end) plus
+        every repeating series and edited occurrence (those can show up anywhere)"""
+        raise NotImplementedError
+
+    def write_batch(self, user: str, upserts=(), deletes=()):
+        """Insert/replace and delete events in one go"""
+        raise NotImplementedError
+
+    def count(self, user: str) -> int:
+        raise NotImplementedError
+
+    def labels(self, user: str) -> list:
+        """Every label the user has used, sorted"""
+        raise NotImplementedError
+
+
+class SQLiteEventBackend(EventBackend):
+    """Events in a local SQLite file (WAL mode, one shared connection per process)"""
+
+    def __init__(self, path: str = "dbt_hub.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            # ids are only unique per user: an import may reuse another account's ids
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    title TEXT,
+                    start_at TEXT NOT NULL,
+                    end_at TEXT,
+                    start_key TEXT NOT NULL,
+                    end_key TEXT NOT NULL,
+                    long INTEGER NOT NULL DEFAULT 0,
+                    series INTEGER NOT NULL DEFAULT 0,
+                    color TEXT,
+                    label TEXT,
+                    details TEXT,
+                    class_name TEXT,
+                    extra TEXT,
+                    PRIMARY KEY (user, id)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_user_start ON events(user, start_key)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_user_label ON events(user, label)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_user_series ON events(user, series)")
+
+    def _row(self, user: str, event: dict) -> dict:
+        start_key = sort_key(event["start"])
+        end_key = sort_key(event.get("end") or event["start"], end=True)
+        row = {column: event.get(field) for field, column in COLUMNS.items()}
+        extra = {k: v for k, v in event.items() if k not in COLUMNS}
+        row.update(
+            user=user, start_key=start_key, end_key=end_key,
+            long=int(_parse(end_key) - _parse(start_key) > LONG_EVENT),
+            series=int(bool(extra.get("rrule")) or split_id(event["id"]) is not None),
+            extra=json.dumps(extra) if extra else None
+        )
+        return row
+
+    @staticmethod
+    def _event(row: sqlite3.Row) -> dict:
+        event = {field: row[column] for field, column in COLUMNS.items() if row[column] is not None}
+        if row["extra"]:
+            event.update(json.loads(row["extra"]))
+        return event
+
+    @timed("event_backend_seconds", op="load")
+    def load(self, user: str, start: str = None, end: str = None) -> list:
+        if start is None and end is None:
+            sql, params = "SELECT * FROM events WHERE user = ? ORDER BY start_key", (user,)
+        else:
+            start_key = sort_key(start) if start else ""
+            end_key = sort_key(end) if end else "9999"
+            # short events must start within LONG_EVENT of the window to reach it,
+            # so the first two are plain index range scans; series rows are few
+            lower = (_parse(start_key) - LONG_EVENT).isoformat() if start_key else ""
+            sql = """
+                SELECT * FROM events
+                 WHERE user = ? AND start_key >= ? AND start_key < ? AND end_key >= ? AND series = 0
+                UNION ALL
+                SELECT * FROM events
+                 WHERE user = ? AND start_key < ? AND long = 1 AND end_key >= ? AND series = 0
+                UNION ALL
+                SELECT * FROM events WHERE user = ? AND series = 1
+                ORDER BY start_key
+            """
+            params = (user, lower, end_key, start_key, user, lower, start_key, user)
+        with self._lock:
+            return [self._event(row) for row in self.conn.execute(sql, params)]
+
+    @timed("event_backend_seconds", op="write_batch")
+    def write_batch(self, user: str, upserts=(), deletes=()):
+        rows = [self._row(user, event) for event in upserts]
+        with self._lock, self.conn:
+            if rows:
+                columns = list(rows[0])
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO events ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(':' + c for c in columns)})",
+                    rows
+                )
+            if deletes:
+                self.conn.executemany(
+                    "DELETE FROM events WHERE id = ? AND user = ?",
+                    [(event_id, user) for event_id in deletes]
+                )
+
+    def count(self, user: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events WHERE user = ?", (user,)).fetchone()[0]
+
+    def labels(self, user: str) -> list:
+        with self._lock:
+            return [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT label FROM events WHERE user = ? AND label IS NOT NULL ORDER BY label", (user,)
+            )]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# -------------------- IN-MEMORY INDEX --------------------
+# what a session works with: id lookups and date-range lookups without
+# scanning a list of dicts, timestamps parsed once instead of on every render
+
+def parse_calendar_date(value: str):
+    """(datetime, all_day, utc) from a FullCalendar date string"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None), False, True
+    return dt, len(value) == 10, False
+
+
+class Event:
+    """One calendar event, FullCalendar JSON only gets built at the component boundary"""
+    __slots__ = ("id", "title", "start", "end", "all_day", "utc", "color", "label",
+                 "details", "class_name", "extra")
+
+    def __init__(self, id, title="", start=None, end=None, all_day=False, utc=False,
+                 color=None, label=None, details=None, class_name=None, extra=None):
+        self.id = id
+        self.title = title
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.utc = utc
+        self.color = sys.intern(color) if color else None
+        self.label = sys.intern(label) if label else None
+        self.details = details
+        self.class_name = sys.intern(class_name) if class_name else None
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, event: dict) -> "Event":
+        start, all_day, utc = parse_calendar_date(event["start"])
+        end = parse_calendar_date(event["end"])[0] if event.get("end") else None
+        extra = {k: v for k, v in event.items() if k not in COLUMNS}
+        return cls(
+            event["id"], event.get("title", ""), start, end, all_day, utc,
+            event.get("color"), event.get("label"), event.get("details"),
+            event.get("className"), extra or None
+        )
+
+    def _format(self, dt: datetime) -> str:
+        if self.all_day:
+            return dt.date().isoformat()
+        return dt.isoformat(timespec="seconds") + ("Z" if self.utc else "")
+
+    def to_dict(self) -> dict:
+        event = {"id": self.id, "title": self.title, "start": self._format(self.start)}
+        if self.end is not None:
+            event["end"] = self._format(self.end)
+        for key, value in (("color", self.color), ("label", self.label),
+                           ("details", self.details), ("className", self.class_name)):
+            if value is not None:
+                event[key] = value
+        if self.extra:
+            event.update(self.extra)
+        return event
+
+    @property
+    def rrule(self):
+        """The recurrence rule if this event is a whole repeating series, else None"""
+        return self.extra.get("rrule") if self.extra else None
+
+    @property
+    def last(self) -> datetime:
+        """When the event stops occupying the calendar (all-day events cover their whole day)"""
+        end = self.end or self.start
+        return end + timedelta(days=1) if self.all_day else end
+
+
+class EventStore:
+    """A user's events indexed by id and by start time, written through to a backend.
+
+    `_starts` is a sorted list of (start, id) so a date window is two bisects;
+    `_longest` is the longest event seen, which bounds how far before the
+    window an overlapping event can start. Anything in `listeners` gets called
+    as listener(removed, added) after every apply (edits show up in both).
+
+    Repeating series sit in `_by_id` like any event but are kept out of
+    `_starts`; `_series` holds their parsed rules, and the occurrences a window
+    needs are generated on demand and kept in `_expanded` until a series or
+    one of its edited occurrences changes. get()/`in`/updated()/apply() accept
+    occurrence ids, so the forms don't need to know about any of this.
+
+    With a backend it's a read-through cache: a calendar window pulls in only
+    the events it needs (`_loaded` are the ranges already in memory), and
+    whatever needs everything (iterating, analytics, export) loads the rest
+    once. Writes always go to the backend first, so memory never disagrees.
+    """
+
+    def __init__(self, backend: EventBackend = None, user: str = "local", events=()):
+        self.backend = backend
+        self.user = user
+        self.listeners = []
+        self._loaded = []  # (start, end) ranges fetched from the backend
+        self._complete = backend is None
+        self._by_id = {}
+        self._starts = []
+        self._longest = timedelta(0)
+        self._series = {}    # series id -> Rule
+        self._expanded = {}  # (start, end) -> occurrences generated for that window
+        for event in events:
+            self._index(event if isinstance(event, Event) else Event.from_dict(event))
+        self._starts.sort()
+
+    @classmethod
+    def load(cls, backend: EventBackend, user: str) -> "EventStore":
+        """A store over `user`'s events in `backend`, nothing is read until a window asks"""
+        return cls(backend, user)
+
+    def ensure(self, start: datetime = None, end: datetime = None):
+        """Make sure everything overlapping [start, end) is in memory (no bounds: everything)"""
+        if self._complete:
+            return
+        if start is None or end is None:
+            self._fetch(self.backend.load(self.user))
+            self._complete, self._loaded = True, []
+        elif not any(lo <= start and end <= hi for lo, hi in self._loaded):
+            self._fetch(self.backend.load(self.user, start.isoformat(), end.isoformat()))
+            self._loaded.append((start, end))
+
+    @timed("event_store_seconds", op="load")
+    def _fetch(self, rows: list):
+        # anything already here is at least as new as the row (writes go through us)
+        fresh = [Event.from_dict(row) for row in rows if row["id"] not in self._by_id]
+        for event in fresh:
+            self._index(event)
+        self._starts.sort()
+        if any(e.rrule or split_id(e.id) for e in fresh):
+            self._expanded.clear()
+
+    def __len__(self):
+        if not self._complete:
+            return self.backend.count(self.user)
+        return len(self._by_id)
+
+    def __contains__(self, event_id):
+        return event_id in self._by_id or self.get(event_id) is not None
+
+    def __iter__(self):
+        """Everything stored: single events in start order, then the series"""
+        self.ensure()
+        return chain((self._by_id[event_id] for _, event_id in self._starts),
+                     (self._by_id[series_id] for series_id in self._series))
+
+    def get(self, event_id: str):
+        event = self._by_id.get(event_id)
+        series_id = self.series_of(event_id) if event is None else None
+        if series_id is not None:
+            original = split_id(event_id)[1]
+            for occurrence in self._expand(series_id, original, original + timedelta(seconds=1)):
+                if occurrence.id == event_id:
+                    return occurrence
+        return event
+
+    # ---- series ----
+
+    def series_of(self, event_id: str):
+        """Id of the series an occurrence id (generated or edited) belongs to, else None"""
+        parts = split_id(event_id)
+        return parts[0] if parts and parts[0] in self._series else None
+
+    def _occurrence(self, series: Event, start: datetime, occurrence_id: str) -> Event:
+        extra = {k: v for k, v in series.extra.items() if k not in RULE_FIELDS}
+        end = start + (series.end - series.start) if series.end is not None else None
+        return Event(occurrence_id, series.title, start, end, series.all_day, series.utc,
+                     series.color, series.label, series.details, series.class_name, extra or None)
+
+    def _expand(self, series_id: str, start: datetime, end: datetime) -> list:
+        """Generated occurrences of one series overlapping [start, end), minus edited ones"""
+        series = self._by_id[series_id]
+        starts = self._series[series_id].starts(
+            series.start, series.last - series.start, start, end,
+            seed=series_id, skip=frozenset(series.extra.get("exdate", ()))
+        )
+        ids = [occurrence_id(series_id, s) for s in starts]
+        return [self._occurrence(series, s, i) for s, i in zip(starts, ids) if i not in self._by_id]
+
+    def _without(self, series_id: str, key: str, pending: dict) -> Event:
+        """Copy of a series with one more deleted occurrence"""
+        series = pending.get(series_id) or self._by_id[series_id]
+        exdate = series.extra.get("exdate", [])
+        if key in exdate:
+            return series
+        fields = {slot: getattr(series, slot) for slot in Event.__slots__}
+        fields["extra"] = {**series.extra, "exdate": [*exdate, key]}
+        return Event(**fields)
+
+    def _index(self, event: Event, sort: bool = False):
+        self._by_id[event.id] = event
+        if event.rrule:
+            self._series[event.id] = Rule.parse(event.rrule)
+            return
+        self._longest = max(self._longest, event.last - event.start)
+        if sort:
+            bisect.insort(self._starts, (event.start, event.id))
+        else:
+            self._starts.append((event.start, event.id))
+
+    def _unindex(self, event_id: str):
+        event = self._by_id.pop(event_id)
+        if self._series.pop(event_id, None) is not None:
+            return event
+        i = bisect.bisect_left(self._starts, (event.start, event.id))
+        del self._starts[i]
+        return event
+
+    @timed("event_store_seconds", op="apply")
+    def apply(self, upserts=(), deletes=()):
+        """Add/replace and delete events, one backend transaction for the lot"""
+        upserts = [e if isinstance(e, Event) else Event.from_dict(e) for e in upserts]
+        if self._series or any(e.rrule for e in upserts):
+            upserts, deletes = self._series_changes(upserts, list(deletes))
+        bulk = len(upserts) > 64
+        if bulk:
+            upserts = list({e.id: e for e in upserts}.values())
+        if self.backend is not None:
+            self.backend.write_batch(self.user, [e.to_dict() for e in upserts], deletes)
+        removed = []
+        for event_id in deletes:
+            if event_id in self._by_id:
+                removed.append(self._unindex(event_id))
+        if bulk:
+            # big change-sets (imports) filter/append and sort once instead of
+            # bisecting per event
+            replaced = [self._by_id.pop(e.id) for e in upserts if e.id in self._by_id]
+            for event in replaced:
+                self._series.pop(event.id, None)
+            if replaced:
+                gone = {e.id for e in replaced}
+                self._starts = [key for key in self._starts if key[1] not in gone]
+                removed.extend(replaced)
+            for event in upserts:
+                self._index(event)
+            self._starts.sort()
+        else:
+            for event in upserts:
+                if event.id in self._by_id:
+                    removed.append(self._unindex(event.id))
+                self._index(event, sort=True)
+        for listener in self.listeners:
+            listener(removed, upserts)
+
+    def _series_changes(self, upserts: list, deletes: list) -> tuple:
+        """Rewrite a change-set for series: deleting an occurrence adds it to its
+        series' exdate list, deleting a series takes its edited occurrences along.
+        Drops the generated windows if anything here touches a series."""
+        pending = {}
+        for event_id in list(deletes):
+            series_id = self.series_of(event_id)
+            if series_id is not None:
+                pending[series_id] = self._without(series_id, event_id.rpartition("@")[2], pending)
+            elif event_id in self._series:
+                self.ensure()  # its edited occurrences may be outside every window loaded so far
+                deletes += [i for i in self._by_id if self.series_of(i) == event_id]
+        upserts += pending.values()
+        if pending or any(i in self._series for i in deletes) \
+                or any(e.rrule or e.id in self._series or self.series_of(e.id) for e in upserts):
+            self._expanded.clear()
+        return upserts, deletes
+
+    def updated(self, event_id: str, **changes) -> Event:
+        """A changed copy of an event, for change-sets (the store itself is untouched)"""
+        old = self.get(event_id)
+        if old is None:
+            raise KeyError(event_id)
+        fields = {slot: getattr(old, slot) for slot in Event.__slots__}
+        fields.update(changes)
+        return Event(**fields)
+
+    @timed("event_store_seconds", op="between")
+    def between(self, start: datetime, end: datetime) -> list:
+        """Events overlapping [start, end), in start order, series expanded into occurrences"""
+        self.ensure(start, end)
+        lo = bisect.bisect_left(self._starts, (start - self._longest,))
+        hi = bisect.bisect_left(self._starts, (end,))
+        events = (self._by_id[event_id] for _, event_id in self._starts[lo:hi])
+        events = [e for e in events if e.last >= start]
+        if not self._series:
+            return events
+        occurrences = self._expanded.get((start, end))
+        if occurrences is None:
+            occurrences = sorted((o for series_id in self._series for o in self._expand(series_id, start, end)),
+                                 key=attrgetter("start"))
+            if len(self._expanded) >= 16:  # a handful of recent windows is all a session revisits
+                self._expanded.clear()
+            self._expanded[(start, end)] = occurrences
+        return list(heapq.merge(events, occurrences, key=attrgetter("start")))
+
+    @timed("event_store_seconds", op="window_json")
+    def window_json(self, start: str, end: str) -> list:
+        """FullCalendar dicts for the events overlapping [start, end)"""
+        start = datetime.fromisoformat(sort_key(start))
+        end = datetime.fromisoformat(sort_key(end))
+        return [e.to_dict() for e in self.between(start, end)]
+
+    def labels(self) -> list:
+        """Every label in use, sorted (from the backend's label index until all is loaded)"""
+        if not self._complete:
+            return self.backend.labels(self.user)
+        return sorted({e.label for e in self._by_id.values() if e.label})
@@ -0,0 +1,229 @@
+# -------------------- SKILL KNOWLEDGE BASE --------------------
+# short notes on each DBT skill, and a BM25 index over them so each chat turn
+# only sends the model the two or three notes that fit the message instead of
+# a system prompt that tries to cover everything. Adding a skill = adding an
+# entry here, the prompt doesn't grow.
+import heapq
+import math
+import re
+from collections import Counter
+from typing import NamedTuple
+
+SKILL_NOTES = [
+    {
+        "skill": "TIPP", "module": "Distress Tolerance",
+        "keywords": "crisis overwhelmed panic intense emotion calm down fast body",
+        "text": "TIPP brings intense emotion down fast by changing body chemistry: Temperature "
+                "(cold water on the face or an ice pack for 30 seconds), Intense exercise for a few "
+                "minutes, Paced breathing (breathe out longer than you breathe in), and Paired "
+                "muscle relaxation (tense a muscle group while breathing in, let go while breathing out).",
+    },
+    {
+        "skill": "STOP", "module": "Distress Tolerance",
+        "keywords": "impulse urge react angry act without thinking",
+        "text": "STOP is for the moment right before acting on an impulse: Stop and freeze, Take a "
+                "step back (a breath, or physically), Observe what is going on inside and around you, "
+                "then Proceed mindfully, asking what will make things better rather than worse.",
+    },
+    {
+        "skill": "ACCEPTS", "module": "Distress Tolerance",
+        "keywords": "distract distraction get through tonight wait it out",
+        "text": "ACCEPTS are ways to distract until a wave of distress passes: Activities, "
+                "Contributing (do something for someone else), Comparisons, opposite Emotions "
+                "(a funny video when sad), Pushing away (put the problem on a mental shelf for now), "
+                "other Thoughts (count, puzzles, lyrics) and intense Sensations (ice, a hot shower, sour candy).",
+    },
+    {
+        "skill": "IMPROVE the moment", "module": "Distress Tolerance",
+        "keywords": "improve moment endure hard situation hope meaning",
+        "text": "IMPROVE helps you get through a hard moment you can't change right now: Imagery "
+                "(picture a safe place), Meaning (find some purpose in it), Prayer or connecting to "
+                "something bigger, Relaxation, One thing in the moment, a brief Vacation (a short break), "
+                "and Encouragement (coach yourself: 'I can do this, it won't last forever').",
+    },
+    {
+        "skill": "Self-soothe", "module": "Distress Tolerance",
+        "keywords": "comfort soothe self care senses calm relax",
+        "text": "Self-soothing means being kind to yourself through the five senses: something nice "
+                "to look at, calming music or sounds, a favourite smell, a comforting taste, and "
+                "touch like a soft blanket, a warm bath or a pet.",
+    },
+    {
+        "skill": "Pros and cons", "module": "Distress Tolerance",
+        "keywords": "decide decision should i urge tempted pros cons",
+        "text": "Pros and cons compares acting on an urge with resisting it: write the short- and "
+                "long-term pros and cons of both. Doing it before a crisis and rereading it when the "
+                "urge hits is what makes it work.",
+    },
+    {
+        "skill": "Urge surfing", "module": "Distress Tolerance",
+        "keywords": "urge craving relapse self harm drink use wave",
+        "text": "Urge surfing treats an urge like a wave: notice where you feel it in the body, "
+                "describe it without acting on it, and breathe while it rises, peaks and falls. Urges "
+                "usually pass within minutes if they aren't fed.",
+    },
+    {
+        "skill": "Radical acceptance", "module": "Distress Tolerance",
+        "keywords": "accept acceptance unfair can't change reality why me fighting",
+        "text": "Radical acceptance means fully acknowledging reality as it is, even when it's painful "
+                "and unfair, without approving of it. Pain plus refusing to accept it turns into "
+                "suffering. Turning the mind is choosing acceptance again each time you drift back "
+                "to fighting it; willingness over willfulness.",
+    },
+    {
+        "skill": "Wise mind", "module": "Mindfulness",
+        "keywords": "wise mind emotion mind reasonable mind intuition balance",
+        "text": "Wise mind is where emotion mind (feelings in charge) and reasonable mind (logic in "
+                "charge) overlap. It's the calm, knowing sense of what is right. Breathing in "
+                "'wise', breathing out 'mind' is one way to drop into it.",
+    },
+    {
+        "skill": "Observe, describe, participate", "module": "Mindfulness",
+        "keywords": "mindful mindfulness present moment observe describe notice participate",
+        "text": "The mindfulness 'what' skills: Observe (notice sensations, thoughts and feelings "
+                "without reacting), Describe (put words to what you notice, facts only), and "
+                "Participate (throw yourself fully into what you're doing).",
+    },
+    {
+        "skill": "Non-judgmentally, one-mindfully, effectively", "module": "Mindfulness",
+        "keywords": "judge judgment judgmental focus distracted effective",
+        "text": "The mindfulness 'how' skills: Non-judgmentally (stick to facts, drop 'good/bad', "
+                "'should'), One-mindfully (one thing at a time, with full attention) and Effectively "
+                "(do what works for your goal rather than what feels right or fair).",
+    },
+    {
+        "skill": "Check the facts", "module": "Emotion Regulation",
+        "keywords": "emotion feelings fit facts assumption interpretation overreact",
+        "text": "Check the facts asks whether an emotion and its intensity fit the situation: what "
+                "happened, what am I assuming, is there a threat, is it a catastrophe? If the emotion "
+                "doesn't fit the facts, opposite action helps; if it does, problem solving does.",
+    },
+    {
+        "skill": "Opposite action", "module": "Emotion Regulation",
+        "keywords": "opposite action fear avoid shame hide anger attack sadness withdraw emotional inertia",
+        "text": "Opposite action changes an emotion that doesn't fit the facts by doing the opposite "
+                "of its urge, all the way: approach what fear wants to avoid, be gently kind when "
+                "anger wants to attack, get active when sadness wants to withdraw, stay visible "
+                "when shame wants to hide.",
+    },
+    {
+        "skill": "ABC PLEASE", "module": "Emotion Regulation",
+        "keywords": "vulnerable sleep eating exercise routine prevention positive mood",
+        "text": "ABC lowers vulnerability to emotion mind: Accumulate positive experiences, Build "
+                "mastery (do something a bit hard every day), Cope ahead (rehearse a tough situation). "
+                "PLEASE looks after the body: treat PhysicaL illness, balanced Eating, avoid "
+                "mood-Altering substances, balanced Sleep, and Exercise.",
+    },
+    {
+        "skill": "DEAR MAN", "module": "Interpersonal Effectiveness",
+        "keywords": "ask request say no boundary conflict partner boss friend family",
+        "text": "DEAR MAN is for asking for something or saying no: Describe the situation, Express "
+                "your feelings, Assert what you want, Reinforce (say why it's good for them too), "
+                "stay Mindful of your goal, Appear confident, and be willing to Negotiate.",
+    },
+    {
+        "skill": "GIVE", "module": "Interpersonal Effectiveness",
+        "keywords": "relationship keep friendship argue partner validate",
+        "text": "GIVE keeps the relationship in good shape while you talk: be Gentle (no attacks or "
+                "threats), act Interested, Validate the other person's feelings and view, and use an "
+                "Easy manner (a little humour, a smile).",
+    },
+    {
+        "skill": "FAST", "module": "Interpersonal Effectiveness",
+        "keywords": "self respect values apologise apologize people pleasing",
+        "text": "FAST protects self-respect: be Fair to yourself and the other person, no excessive "
+                "Apologies, Stick to your values, and be Truthful without exaggerating.",
+    },
+    {
+        "skill": "Chain analysis", "module": "Behaviour analysis",
+        "keywords": "chain analysis why did i relapse behaviour problem behavior understand",
+        "text": "Chain analysis walks through a problem behaviour step by step: what made you "
+                "vulnerable, the prompting event, each link (thoughts, feelings, sensations, actions) "
+                "leading up to it, and the consequences. Then look for where a skill could have "
+                "broken the chain next time.",
+    },
+    {
+        "skill": "Self-validation", "module": "Emotion Regulation",
+        "keywords": "validate validation invalid stupid overreacting dramatic",
+        "text": "Self-validation means acknowledging that your feelings make sense given your history "
+                "or the situation, even if your reaction wasn't effective. 'It makes sense that I feel "
+                "this way' is not the same as 'what I did was ok'.",
+    },
+    {
+        "skill": "Safety", "module": "Crisis",
+        "keywords": "suicide suicidal kill myself end it hurt myself self harm die emergency",
+        "text": "If someone is thinking about ending their life or is in danger, DBT skills are not "
+                "enough on their own: encourage them to contact local emergency services or a crisis "
+                "line right now, or reach out to someone they trust. Be warm, take it seriously and "
+                "don't try to treat it.",
+    },
+]
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can can't do don't for from how i i'm im in is it it's its just me my "
+    "of on or so that the this to was what what's when with you your about have has had been really "
+    "feel feeling want wants know keep like get go will would could he she him her they them we us "
+    "there then one some all more very".split()
+)
+
+
+def _stem(word: str) -> str:
+    # crude, but enough for "urges"/"urge", "judging"/"judge", "calmness"/"calm"
+    for suffix in ("ingly", "ness", "ing", "edly", "ed", "es", "ly", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def terms(text: str) -> list:
+    return [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+class Snippet(NamedTuple):
+    skill: str
+    module: str
+    text: str
+    score: float
+
+
+class KnowledgeIndex:
+    """BM25 over the notes, with each term's per-note weight worked out up front.
+
+    The index is a sparse term -> [(note, weight), ...] map, so a query costs a
+    dict lookup per query term plus the notes that contain it.
+    """
+
+    def __init__(self, notes: list, k1: float = 1.2, b: float = 0.75):
+        self.notes = notes
+        docs = [terms(f"{n['skill']} {n['skill']} {n['keywords']} {n['text']}") for n in notes]
+        avg_len = sum(map(len, docs)) / max(len(docs), 1)
+        df = Counter(t for doc in docs for t in set(doc))
+        self.postings = {}
+        for i, doc in enumerate(docs):
+            norm = k1 * (1 - b + b * len(doc) / avg_len)
+            for term, tf in Counter(doc).items():
+                idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                self.postings.setdefault(term, []).append((i, idf * tf * (k1 + 1) / (tf + norm)))
+
+    def search(self, text: str, k: int = 3, min_score: float = 2.5, relative: float = 0.5) -> list:
+        """Top-k notes for the text, best first.
+
+        Notes scoring under min_score, or under `relative` x the best score, are
+        dropped: one solid match beats padding the prompt with weak ones.
+        """
+        scores = Counter()
+        for term in set(terms(text)):
+            for i, weight in self.postings.get(term, ()):
+                scores[i] += weight
+        if not scores:
+            return []
+        cutoff = max(min_score, relative * max(scores.values()))
+        best = heapq.nlargest(k, ((s, i) for i, s in scores.items() if s >= cutoff))
+        return [Snippet(self.notes[i]["skill"], self.notes[i]["module"], self.notes[i]["text"], s)
+                for s, i in best]
+
+
+def reference(snippets: list) -> str:
+    """The notes as they get attached to the latest user message"""
+    return "\n".join(f"- {s.skill} ({s.module}): {s.text}" for s in snippets)
@@ -0,0 +1,227 @@
+# -------------------- METRICS --------------------
+# in-process counters and histograms for where the time goes: panel reruns,
+# form handlers, inference, skill matching, the event store. Components that
+# keep their own numbers (dispatcher queue, response cache) hand them over as
+# gauges, read whenever a snapshot is taken.
+#
+# Off by default (METRICS=on turns it on). While off, span() hands back one
+# shared do-nothing context manager and @timed calls straight through, so the
+# instrumented code pays an attribute lookup and nothing else.
+import bisect
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# seconds, roughly Prometheus' defaults stretched out for model calls
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKENS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate from the buckets, linear inside the bucket it lands in"""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("registry", "key", "start")
+
+    def __init__(self, registry, key):
+        self.registry, self.key = registry, key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # reruns/stops unwind through here as exceptions too, still worth timing
+        self.registry._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> float
+        self._buckets = {}     # name -> bounds, for non-time histograms
+        self._collectors = {}  # (prefix, labels) -> callable returning {stat: number}
+
+    def buckets(self, name: str, bounds):
+        self._buckets[name] = tuple(bounds)
+
+    def observe(self, name: str, value: float, **labels):
+        if self.enabled:
+            self._observe(_key(name, labels), value)
+
+    def _observe(self, key: tuple, value: float):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._buckets.get(key[0], SECONDS))
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def span(self, name: str, **labels):
+        """with span("panel_seconds", panel="chat"): ... records how long the block took"""
+        return _Span(self, _key(name, labels)) if self.enabled else NO_SPAN
+
+    def timed(self, name: str, **labels):
+        """Decorator version of span"""
+        key = _key(name, labels)
+
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, key):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def collect(self, prefix: str, stats, **labels):
+        """Report stats() as gauges named prefix_<stat> on every snapshot (re-registering replaces)"""
+        with self._lock:
+            self._collectors[_key(prefix, labels)] = stats
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # ---- export ----
+
+    def snapshot(self) -> list:
+        """One dict per series, histograms with count/sum/p50/p95"""
+        with self._lock:
+            histograms = [(k, h.count, h.sum, h.quantile(0.5), h.quantile(0.95), list(h.counts), h.bounds)
+                          for k, h in self._histograms.items()]
+            counters = list(self._counters.items())
+            collectors = list(self._collectors.items())
+        now = time.time()
+        rows = [{"time": now, "type": "counter", "name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in counters]
+        # outside the lock, stats() takes the component's own lock
+        rows += [{"time": now, "type": "gauge", "name": f"{prefix}_{stat}", "labels": dict(labels), "value": value}
+                 for (prefix, labels), stats in collectors
+                 for stat, value in stats().items() if isinstance(value, (int, float))]
+        rows += [{"time": now, "type": "histogram", "name": name, "labels": dict(labels),
+                  "count": count, "sum": total, "p50": p50, "p95": p95,
+                  "buckets": dict(zip([*map(str, bounds), "+Inf"], counts))}
+                 for (name, labels), count, total, p50, p95, counts, bounds in histograms]
+        return sorted(rows, key=lambda r: (r["name"], sorted(r["labels"].items())))
+
+    def jsonl(self) -> str:
+        return "".join(json.dumps(row) + "\n" for row in self.snapshot())
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        def labelset(labels, **more):
+            pairs = {**labels, **more}
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+        lines, typed = [], set()
+        for row in self.snapshot():
+            name = "dbt_hub_" + row["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} {row['type']}")
+                typed.add(name)
+            if row["type"] in ("counter", "gauge"):
+                lines.append(f"{name}{labelset(row['labels'])} {row['value']:g}")
+                continue
+            cumulative = 0
+            for bound, n in row["buckets"].items():
+                cumulative += n
+                lines.append(f"{name}_bucket{labelset(row['labels'], le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{labelset(row['labels'])} {row['sum']:g}")
+            lines.append(f"{name}_count{labelset(row['labels'])} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """GET /metrics on a side port for a Prometheus scraper (Streamlit has no custom routes)"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# one per process, same as the caches in app.py
+METRICS = Registry()
+METRICS.buckets("inference_tokens", TOKENS)
+METRICS.buckets("retrieved_notes", (0, 1, 2, 3, 5, 8))
+span = METRICS.span
+timed = METRICS.timed
+observe = METRICS.observe
+inc = METRICS.inc
@@ -0,0 +1,73 @@
+# -------------------- PAGE CONTENT --------------------
+# plain data the panels lay out. It lives in a module rather than in app.py,
+# which Streamlit re-executes on every rerun, so it's built once per process.
+
+# ---- calendar ----
+CALENDAR_OPTIONS = {
+    "editable": True,
+    "selectable": True,
+    "selectMirror": True,
+    "selectHelper": True,
+    "selectOverlap": True,
+    "slotDuration": "00:15:00",
+    "slotMinTime": "00:00:00",
+    "slotMaxTime": "24:00:00",
+    "dateClick": True,
+    # prev/next/today and the view switch are Streamlit controls above the
+    # calendar (FullCalendar's own don't tell us what's on screen)
+    "headerToolbar": {
+        "left": "",
+        "center": "title",
+        "right": "",
+    },
+    "initialView": "dayGridMonth",
+}
+
+CALENDAR_CSS = """
+    .fc-event-title {
+        font-weight: 700;
+    }
+    .fc-toolbar-title {
+        font-size: 2rem;
+    }
+    .fc-event-past {
+        opacity: 0.5;
+    }
+    .fc-event-time {
+        font-style: italic;
+    }
+    .fc-entry-event {
+        background-color: white !important;
+        color: black !important;
+        border-color: white !important;
+    }
+"""
+
+# ---- featured / about / sidebar ----
+
+FEATURED_LINES = [
+    "DBT resources and exercises will appear here",
+    "Cute Ghosts on Drinking Straws by Kaboompics.com licensed under CC BY 4.0.",
+]
+
+SKILL_OF_THE_DAY = {
+    "image": "https://via.placeholder.com/60",
+    "text": "**DBT Skill of the Day**  \nLearn how to use Opposite Action to fight emotional inertia.",
+}
+
+ABOUT_CARDS = [
+    """
+    **DBT zine!**  
+    [Check it out!](https://www.reddit.com/r/zines/comments/1m1r9ct/wip_dbt_zine/)
+    """,
+    """
+    **Will Wood - Marsha, Thankk You for the Dialectics, but I Need You to Leave (Official Lyric Video)**  
+    [Listen to it here!](https://www.youtube.com/watch?v=nyIKBT7-a9M&list=RDnyIKBT7-a9M&start_radio=1)
+    """,
+]
+
+SIDEBAR_NOTES = {
+    "Mindfulness": """ mindfullness of current emotions: experiencing emotions without 
+        necessarily acting on them => you can experience them without falling apart""",
+    "Distress Tolerance": "TIPP Skill: Temperature, Intense exercise...",
+}
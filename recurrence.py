@@ -0,0 +1,206 @@
+# -------------------- RECURRENCE --------------------
+# repeating events (ESM check-ins, a weekly group) are stored as ONE event
+# carrying an RRULE-style rule in `rrule`. Occurrences are never stored: they
+# get generated for whatever window the calendar is looking at, so a schedule
+# that runs for years costs the same as one that runs for a week.
+#
+# An occurrence's id is "<series id>@<YYYYMMDDTHHMMSS of its original start>".
+# Editing one stores a plain event under that id, which then stands in for the
+# generated one; deleting one adds that timestamp to the series' `exdate` list.
+import random
+from datetime import date, datetime, time, timedelta
+
+FREQS = ("DAILY", "WEEKLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+KEY_FORMAT = "%Y%m%dT%H%M%S"
+RULE_FIELDS = ("rrule", "exdate")  # extra fields that belong to the series, not its occurrences
+
+
+class RuleError(ValueError):
+    """A rule we can't store or expand"""
+
+
+def occurrence_key(dt: datetime) -> str:
+    # same as strftime(KEY_FORMAT), a lot cheaper and called once per occurrence
+    return dt.isoformat(timespec="seconds").replace("-", "").replace(":", "")
+
+
+def occurrence_id(series_id: str, dt: datetime) -> str:
+    return f"{series_id}@{occurrence_key(dt)}"
+
+
+def split_id(event_id: str):
+    """(series id, original start) if event_id looks like an occurrence id, else None"""
+    if not isinstance(event_id, str):
+        return None
+    series_id, sep, key = event_id.rpartition("@")
+    if not sep or len(key) != 15:
+        return None
+    try:
+        return series_id, datetime.strptime(key, KEY_FORMAT)
+    except ValueError:
+        return None
+
+
+def _hhmm(value: str) -> time:
+    value = value.replace(":", "")
+    if len(value) != 4 or not value.isdigit():
+        raise RuleError(f"expected HHMM, got {value!r}")
+    return time(int(value[:2]), int(value[2:]))
+
+
+def _until(value: str) -> datetime:
+    value = value.rstrip("Z")
+    if len(value) == 8:  # a date: the whole day counts
+        return datetime.strptime(value, "%Y%m%d") + timedelta(days=1, seconds=-1)
+    return datetime.strptime(value, KEY_FORMAT)
+
+
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+class Rule:
+    """A parsed recurrence rule.
+
+    FREQ (DAILY or WEEKLY), INTERVAL, BYDAY, COUNT and UNTIL mean what they do
+    in RFC 5545. X-ESM=n turns each day into n experience-sampling prompts at
+    random times between X-WINDOW=HHMM-HHMM, at least X-GAP minutes apart.
+    The times are seeded by series and day, so a day always expands to the
+    same prompts without anything being stored for it.
+    """
+    __slots__ = ("freq", "interval", "byday", "count", "until", "esm", "window", "gap")
+
+    def __init__(self, freq="DAILY", interval=1, byday=(), count=None, until=None,
+                 esm=0, window=(time(9), time(21)), gap=30):
+        if freq not in FREQS:
+            raise RuleError(f"FREQ must be one of {', '.join(FREQS)}, not {freq!r}")
+        if interval < 1 or (count is not None and count < 1) or esm < 0 or gap < 0:
+            raise RuleError("INTERVAL, COUNT, X-ESM and X-GAP can't be negative or zero")
+        self.freq = freq
+        self.interval = interval
+        self.byday = tuple(sorted(set(byday)))
+        self.count = count
+        self.until = until
+        self.esm = esm
+        self.window = window
+        self.gap = gap
+        if esm and self._slack() < 0:
+            raise RuleError(f"{esm} prompts {gap} minutes apart don't fit between "
+                            f"{window[0]:%H:%M} and {window[1]:%H:%M}")
+
+    @classmethod
+    def parse(cls, text: str) -> "Rule":
+        """'FREQ=WEEKLY;BYDAY=MO,TH;COUNT=10' -> Rule, RuleError if we can't expand it"""
+        parts = {}
+        for part in text.strip().removeprefix("RRULE:").split(";"):
+            if part:
+                name, sep, value = part.partition("=")
+                if not sep:
+                    raise RuleError(f"bad rule part {part!r}")
+                parts[name.strip().upper()] = value.strip()
+        try:
+            kwargs = {"freq": parts.pop("FREQ", "").upper()}
+            if "INTERVAL" in parts:
+                kwargs["interval"] = int(parts.pop("INTERVAL"))
+            if "BYDAY" in parts:
+                kwargs["byday"] = [WEEKDAYS.index(d.strip().upper()) for d in parts.pop("BYDAY").split(",")]
+            if "COUNT" in parts:
+                kwargs["count"] = int(parts.pop("COUNT"))
+            if "UNTIL" in parts:
+                kwargs["until"] = _until(parts.pop("UNTIL"))
+            if "X-ESM" in parts:
+                kwargs["esm"] = int(parts.pop("X-ESM"))
+            if "X-WINDOW" in parts:
+                first, _, last = parts.pop("X-WINDOW").partition("-")
+                kwargs["window"] = (_hhmm(first), _hhmm(last))
+            if "X-GAP" in parts:
+                kwargs["gap"] = int(parts.pop("X-GAP"))
+        except ValueError as e:
+            raise RuleError(f"bad rule {text!r} ({e})") from None
+        if parts:
+            # BYMONTH, BYSETPOS... expanding those wrong would be worse than refusing
+            raise RuleError(f"unsupported rule parts: {', '.join(parts)}")
+        if kwargs.get("byday") and kwargs["freq"] == "DAILY":
+            raise RuleError("BYDAY is only supported with FREQ=WEEKLY")
+        return cls(**kwargs)
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in self.byday))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={occurrence_key(self.until)}")
+        if self.esm:
+            parts += [f"X-ESM={self.esm}", f"X-WINDOW={self.window[0]:%H%M}-{self.window[1]:%H%M}",
+                      f"X-GAP={self.gap}"]
+        return ";".join(parts)
+
+    # ---- expansion ----
+    # days are date ordinals; ordinal 1 was a Monday, so (day - 1) % 7 is the weekday
+
+    def _slack(self) -> int:
+        return _minutes(self.window[1]) - _minutes(self.window[0]) - (self.esm - 1) * self.gap
+
+    def _matches(self, first: int, day: int, byday: tuple) -> bool:
+        if self.freq == "DAILY":
+            return (day - first) % self.interval == 0
+        anchor = first - (first - 1) % 7  # Monday of the first week
+        return (day - anchor) // 7 % self.interval == 0 and (day - 1) % 7 in byday
+
+    def _days_before(self, first: int, day: int, byday: tuple) -> int:
+        """How many days in [first, day) have occurrences, without walking them"""
+        if day <= first:
+            return 0
+        if self.freq == "DAILY":
+            return (day - first + self.interval - 1) // self.interval
+        anchor = first - (first - 1) % 7
+
+        def upto(d):  # matching days in [anchor, d)
+            full, rest = divmod(d - anchor, 7 * self.interval)
+            return full * len(byday) + sum(1 for weekday in byday if weekday < rest)
+        return upto(day) - upto(first)
+
+    def _times(self, day: int, dtstart: datetime, seed: str) -> list:
+        if not self.esm:
+            return [dtstart.time()]
+        rng = random.Random(f"{seed}:{day}")
+        picks = sorted(rng.randint(0, self._slack()) for _ in range(self.esm))
+        first = _minutes(self.window[0])
+        return [time(*divmod(first + pick + i * self.gap, 60)) for i, pick in enumerate(picks)]
+
+    def starts(self, dtstart: datetime, span: timedelta, start: datetime, end: datetime,
+               seed: str = "", skip=()) -> list:
+        """Start times of the occurrences overlapping [start, end), in order.
+
+        `span` is how long one occurrence occupies the calendar and `skip` the
+        occurrence keys that were deleted. Only the days in the window are
+        looked at; COUNT is worked out arithmetically for the days before it.
+        """
+        byday = self.byday or ((dtstart.weekday(),) if self.freq == "WEEKLY" else ())
+        first = dtstart.toordinal()
+        lo = max(first, (start - span).toordinal())
+        hi = end.toordinal()
+        if self.until is not None:
+            hi = min(hi, self.until.toordinal())
+        index = self._days_before(first, lo, byday) * (self.esm or 1)
+        found = []
+        for day in range(lo, hi + 1):
+            if not self._matches(first, day, byday):
+                continue
+            on = date.fromordinal(day)
+            for t in self._times(day, dtstart, seed):
+                if self.count is not None and index >= self.count:
+                    return found
+                index += 1
+                occurrence = datetime.combine(on, t)
+                if self.until is not None and occurrence > self.until:
+                    return found
+                if occurrence < end and occurrence + span >= start \
+                        and not (skip and occurrence_key(occurrence) in skip):
+                    found.append(occurrence)
+        return found
@@ -0,0 +1,164 @@
+# -------------------- LATENCY SLO --------------------
+# keeps the chat tab from hanging on a slow or broken provider: a deadline on
+# the first token, a hedged second request when the first is slower than
+# usual, and a circuit breaker that switches to instant local replies while
+# the backend is unhealthy
+import queue
+import threading
+import time
+from collections import deque
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples"""
+
+    def __init__(self, window: int = 200, default: float = 2.0, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.default = default
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.default
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class CircuitBreaker:
+    """closed -> (failure_threshold failures in a row) -> open for `cooldown`
+    seconds -> half-open: one trial call decides whether to close again"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """May a call go to the backend right now? (half-open lets exactly one through)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def release(self):
+        """The call was abandoned (user moved on) before it said anything either way"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+def _pump(index, start, inbox, stop):
+    """Run one candidate stream on its own thread, forwarding into inbox"""
+    chunks = None
+    try:
+        chunks = start()
+        for chunk in chunks:
+            if stop.is_set():
+                return
+            inbox.put((index, "chunk", chunk))
+        inbox.put((index, "done", None))
+    except Exception as e:
+        inbox.put((index, "error", e))
+    finally:
+        if chunks is not None and hasattr(chunks, "close"):
+            chunks.close()
+
+
+def hedged(start_primary, start_hedge=None, hedge_after: float = 2.0, deadline: float = 15.0):
+    """Yield the chunks of whichever request produces its first chunk first.
+
+    start_primary / start_hedge return chunk iterators. The hedge only starts if
+    the primary has nothing after `hedge_after` seconds (or fails outright).
+    DeadlineExceeded if neither has produced anything within `deadline`.
+    """
+    inbox = queue.Queue()
+    stops = []
+    starters = [start_primary] + ([start_hedge] if start_hedge else [])
+    began = time.monotonic()
+
+    def launch():
+        stop = threading.Event()
+        stops.append(stop)
+        threading.Thread(
+            target=_pump, args=(len(stops) - 1, starters[len(stops) - 1], inbox, stop), daemon=True
+        ).start()
+
+    launch()
+    winner, failed = None, []
+    try:
+        while winner is None:
+            elapsed = time.monotonic() - began
+            can_hedge = len(stops) < len(starters)
+            wait = (hedge_after if can_hedge else deadline) - elapsed
+            try:
+                index, kind, value = inbox.get(timeout=max(0.0, min(wait, deadline - elapsed)))
+            except queue.Empty:
+                if time.monotonic() - began >= deadline:
+                    raise DeadlineExceeded(f"no reply within {deadline:g}s")
+                launch()
+                continue
+            if kind == "error":
+                failed.append(value)
+                if can_hedge:
+                    launch()  # fail over right away instead of waiting out the delay
+                elif len(failed) == len(stops):
+                    raise failed[0]
+                continue
+            winner = index
+            for i, stop in enumerate(stops):
+                if i != winner:
+                    stop.set()
+            if kind == "done":
+                return
+            yield value
+
+        while True:
+            index, kind, value = inbox.get(timeout=deadline)  # gap between chunks
+            if index != winner:
+                continue
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    except queue.Empty:
+        raise DeadlineExceeded(f"reply stalled for {deadline:g}s")
+    finally:
+        for stop in stops:
+            stop.set()
@@ -0,0 +1,115 @@
+# -------------------- RESPONSE CACHE --------------------
+# lots of people ask the same "what is TIPP" kind of question, no point paying
+# for a full model call every time. Shared by every session in the process.
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_CONTRACTIONS = {"whats": "what is", "hows": "how is"}
+
+# questions about a skill itself, not about the person asking
+_GENERAL_RE = re.compile(
+    r"^(what is|what are|what does|explain|define|describe|tell me about|"
+    r"how do (i|you) (do|use|practice)|meaning of)\b"
+)
+_PERSONAL_WORDS = {
+    "my", "me", "myself", "im", "ive", "id", "we", "our", "us",
+    "feel", "feeling", "felt", "today", "yesterday", "tonight",
+}
+# words pointing at someone or back into the chat ("explain that again", "what
+# is the second one"): the answer depends on history the cache never sees
+_REFERENCE_WORDS = {
+    "he", "she", "they", "him", "her", "them", "his", "hers", "their", "theirs",
+    "it", "its", "that", "this", "these", "those", "one", "ones",
+    "again", "above", "earlier", "previous", "last", "first", "second", "third", "other",
+}
+
+
+def normalize(prompt: str) -> str:
+    words = _PUNCT_RE.sub("", prompt.lower()).split()
+    return " ".join(_CONTRACTIONS.get(w, w) for w in words)
+
+
+def is_general_question(prompt: str) -> bool:
+    """True for skill questions whose answer doesn't depend on who is asking"""
+    text = normalize(prompt)
+    words = set(text.split())
+    return bool(_GENERAL_RE.match(text)) and not (words & _PERSONAL_WORDS or words & _REFERENCE_WORDS)
+
+
+def make_key(prompt: str, history: list = (), turns: int = 0) -> str:
+    """Normalized prompt + a hash of the last `turns` messages that shaped the reply"""
+    digest = hashlib.sha1()
+    for m in (history[-turns:] if turns else []):
+        digest.update(f"{m['role']}\x00{m['content']}\x00".encode())
+    return f"{normalize(prompt)}\x00{digest.hexdigest()[:16]}"
+
+
+class ResponseCache:
+    """Thread-safe LRU with a TTL and a cap on the total size of stored replies"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 6 * 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, reply, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, reply: str):
+        size = len(key.encode()) + len(reply.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, reply, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def caching(chunks, cache: ResponseCache, key: str):
+    """Pass a streamed reply through and store it once it finished cleanly"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if parts:
+        cache.put(key, "".join(parts))
@@ -0,0 +1,110 @@
+# -------------------- SKILLS DATABASE --------------------
+# moved out of app.py so the table can grow without touching the UI code
+from difflib import SequenceMatcher
+from functools import lru_cache
+import re
+from typing import NamedTuple
+
+DBT_SKILLS = {
+    "mindfulness": {
+        "keywords": ["mindful", "present moment", "observe"],
+        "response": "Let's practice mindfulness. Try focusing on your breath for 60 seconds..."
+    },
+    "distress_tolerance": {
+        "keywords": ["crisis", "distress", "urge"],
+        "response": "In moments of distress, try the TIPP skill..."
+    }
+}
+
+# so "urges", "observed" and "mindfulness" still count as their keyword
+SUFFIXES = ("", "s", "es", "ed", "d", "ing", "ness", "ly")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _deletions(word: str) -> set:
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class SkillMatch(NamedTuple):
+    skill: str
+    score: float
+    keywords: tuple
+
+
+class SkillMatcher:
+    """Matches text against every skill keyword at once.
+
+    Keywords (and their inflections) are compiled into one phrase table keyed by
+    word tuples, so matching looks up each word n-gram of the input once instead
+    of scanning every keyword of every skill: the cost depends on the length of
+    the message, not on how many skills there are. Only whole words match, so
+    "surge" no longer counts as "urge".
+    """
+
+    def __init__(self, skills: dict, fuzzy: bool = True, fuzzy_cutoff: float = 0.85):
+        self.order = {name: i for i, name in enumerate(skills)}
+        self.phrases = {}  # word tuple -> [(skill, keyword), ...]
+        self.max_words = 1
+        for name, data in skills.items():
+            for keyword in data["keywords"]:
+                words = tuple(_WORD_RE.findall(keyword.lower()))
+                if not words:
+                    continue
+                self.max_words = max(self.max_words, len(words))
+                for suffix in SUFFIXES:
+                    variant = words[:-1] + (words[-1] + suffix,)
+                    hits = self.phrases.setdefault(variant, [])
+                    if (name, keyword) not in hits:
+                        hits.append((name, keyword))
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # typo tier: index every single-letter deletion of each keyword word, a
+        # typo within one edit (or a swap) of a keyword shares one of them
+        self._deletions = {}
+        if fuzzy:
+            for (word, *rest) in self.phrases:
+                if not rest and len(word) >= 5:
+                    for key in _deletions(word):
+                        self._deletions.setdefault(key, set()).add(word)
+        self._closest = lru_cache(maxsize=8192)(self._closest_word)
+
+    def _closest_word(self, word: str):
+        candidates = set()
+        for key in _deletions(word):
+            candidates |= self._deletions.get(key, set())
+        best, best_ratio = None, self.fuzzy_cutoff
+        for candidate in candidates:
+            ratio = SequenceMatcher(None, word, candidate).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def match(self, text: str) -> list:
+        """Skills mentioned in text, best first. Multi-word phrases weigh more, typos less."""
+        words = _WORD_RE.findall(text.lower())
+        scores, found = {}, {}
+
+        def hit(phrase, weight):
+            for name, keyword in self.phrases[phrase]:
+                scores[name] = scores.get(name, 0.0) + weight
+                found.setdefault(name, []).append(keyword)
+
+        for i in range(len(words)):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                phrase = tuple(words[i:i + n])
+                if phrase in self.phrases:
+                    hit(phrase, float(n))
+                    break
+
+        if not scores and self.fuzzy:
+            for word in words:
+                if len(word) >= 5:
+                    close = self._closest(word)
+                    if close:
+                        hit((close,), 0.5)
+
+        return sorted(
+            (SkillMatch(name, score, tuple(found[name])) for name, score in scores.items()),
+            key=lambda m: (-m.score, self.order[m.skill])
+        )
@@ -0,0 +1,5 @@
+# the app's modules sit at the repo root, not in a package
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
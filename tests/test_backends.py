@@ -0,0 +1,76 @@
+"""LocalBackend on a tiny random checkpoint built on the fly (skipped without torch/transformers)."""
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from backends import LocalBackend  # noqa: E402
+
+SYSTEM = {"role": "system", "content": "You are a DBT coach. " * 10}
+CHAT_TEMPLATE = ("{% for m in messages %}<|{{ m['role'] }}|>{{ m['content'] }}</s>{% endfor %}"
+                 "{% if add_generation_prompt %}<|assistant|>{% endif %}")
+
+
+@pytest.fixture(scope="module")
+def checkpoint(tmp_path_factory):
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    path = tmp_path_factory.mktemp("tiny")
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    tok.train_from_iterator(["You are a DBT coach. hello, how do I use wise mind? tell me more"] * 10,
+                            trainers.BpeTrainer(
+                                vocab_size=300, initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+                                special_tokens=["<unk>", "<s>", "</s>", "<|system|>", "<|user|>", "<|assistant|>"]))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+    tokenizer.chat_template = CHAT_TEMPLATE
+    tokenizer.save_pretrained(path)
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=512,
+                         bos_token_id=1, eos_token_id=2)
+    LlamaForCausalLM(config).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def backend(checkpoint):
+    backend = LocalBackend(checkpoint, quantization="none", max_new_tokens=8)
+    backend.model.generation_config.do_sample = False
+    return backend
+
+
+def test_stream_yields_text(backend):
+    chunks = list(backend.stream([SYSTEM, {"role": "user", "content": "hello"}]))
+    assert chunks and all(isinstance(c, str) for c in chunks)
+
+
+def test_system_prompt_cache_is_reused_and_changes_nothing(backend, monkeypatch):
+    messages = [SYSTEM, {"role": "user", "content": "how do I use wise mind?"}]
+    cached = backend.complete(messages)
+    assert cached
+    prefix = backend._prefix_cache
+    assert prefix is not None
+    assert backend.complete(messages + [{"role": "assistant", "content": cached},
+                                        {"role": "user", "content": "tell me more"}])
+    assert backend._prefix_cache is prefix  # same system prompt, not recomputed
+
+    monkeypatch.setattr(backend, "_cached_prefix", lambda messages, input_ids: None)
+    assert backend.complete(messages) == cached
+
+
+def test_closing_the_stream_stops_generating(backend):
+    stream = backend.stream([SYSTEM, {"role": "user", "content": "hello"}], max_tokens=200)
+    next(stream)
+    stream.close()  # joins the generate() thread, must not hang
+    assert not backend._lock.locked()
+
+
+def test_complete_batch_answers_each_conversation(backend):
+    batch = [[SYSTEM, {"role": "user", "content": "hello"}],
+             [{"role": "user", "content": "tell me more about wise mind"}]]
+    replies = backend.complete_batch(batch, max_tokens=4)
+    assert len(replies) == 2 and all(isinstance(r, str) for r in replies)
@@ -0,0 +1,50 @@
+"""ConversationContext: the window, and summarizing outside the turn."""
+from context import ConversationContext
+
+
+def chat(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(n)]
+
+
+def test_build_never_calls_the_summarizer():
+    calls = []
+    context = ConversationContext("system", keep_turns=2, summarizer=lambda *a: calls.append(a) or "s")
+    messages = context.build(chat(30))
+    assert calls == []
+    assert [m["content"] for m in messages[1:]] == [f"message {i}" for i in range(30)]
+
+
+def test_fold_in_batches_and_use_the_finished_summary():
+    context = ConversationContext("system", keep_turns=2,
+                                  summarizer=lambda summary, messages, budget: f"{len(messages)} folded")
+    history = chat(8)
+    assert context.due(history) is None  # 2 * keep_turns turns still fit
+    history = chat(9)
+    first, cut, messages = context.due(history)
+    assert (first, cut, len(messages)) == (0, 5, 5)
+    assert context.due(history) is None  # one fold at a time
+    # the turn before the fold finishes still has everything verbatim
+    assert len(context.build(history)) == 10
+    context.fold(first, cut, messages)
+    built = context.build(history)
+    # the system prompt stays as it is (LocalBackend caches it), the summary follows it
+    assert built[0] == {"role": "system", "content": "system"}
+    assert built[1]["role"] == "system" and built[1]["content"].endswith("5 folded")
+    assert [m["content"] for m in built[2:]] == [f"message {i}" for i in range(5, 9)]
+
+
+def test_failed_summarizer_falls_back_to_extractive():
+    def broken(*args):
+        raise RuntimeError("provider down")
+    context = ConversationContext("system", keep_turns=1, summarizer=broken)
+    context.fold(*context.due(chat(5)))
+    assert "message 0" in context.summary and context.summarized == 3
+    assert not context.folding
+
+
+def test_new_chat_starts_over():
+    context = ConversationContext("system", keep_turns=1)
+    context.fold(*context.due(chat(5)))
+    assert context.summarized
+    context.build(chat(1))
+    assert (context.summary, context.summarized) == ("", 0)
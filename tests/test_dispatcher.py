@@ -0,0 +1,230 @@
+"""InferenceDispatcher against a stub backend: no model, no network."""
+import threading
+import time
+
+import pytest
+
+from dispatcher import InferenceDispatcher
+from metrics import Registry
+
+
+class StubBackend:
+    """Replies "<prompt>:1", "<prompt>:2"... Calls block until `release` is set,
+    a "hang" prompt until `unhang` is (like a provider that never answers)"""
+
+    def __init__(self, batching=False, chunks=2, delay=0.0):
+        self.supports_batching = batching
+        self.chunks = chunks
+        self.delay = delay  # between chunks
+        self.release = threading.Event()
+        self.release.set()
+        self.unhang = threading.Event()
+        self.calls = []  # prompts in the order calls started, batches as tuples
+        self.running = 0
+        self.peak = 0
+        self.sent = 0
+        self.closed = 0
+        self._lock = threading.Lock()
+
+    def _start(self, call):
+        with self._lock:
+            self.calls.append(call)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def _stop(self):
+        with self._lock:
+            self.running -= 1
+
+    def stream(self, messages, max_tokens=None):
+        prompt = messages[-1]["content"]
+        self._start(prompt)
+        try:
+            self.release.wait(5)
+            if prompt == "hang":
+                self.unhang.wait(5)
+            if prompt == "fail":
+                raise RuntimeError("backend down")
+            for i in range(self.chunks):
+                time.sleep(self.delay)
+                self.sent += 1
+                yield f"{prompt}:{i + 1}"
+        finally:
+            self.closed += 1
+            self._stop()
+
+    def complete_batch(self, batch, max_tokens=None):
+        prompts = tuple(m[-1]["content"] for m in batch)
+        self._start(prompts)
+        try:
+            self.release.wait(5)
+            return [f"{p}:done" for p in prompts]
+        finally:
+            self._stop()
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def read_all(dispatcher, session, text, **kwargs):
+    return "".join(dispatcher.submit(session, ask(text), **kwargs))
+
+
+def in_threads(*calls):
+    """Run each zero-arg call on its own thread, return their results in order"""
+    results = [None] * len(calls)
+
+    def run(i, call):
+        try:
+            results[i] = call()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return results
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.005)
+
+
+def test_streams_reply_chunks():
+    dispatcher = InferenceDispatcher(StubBackend(chunks=3))
+    assert list(dispatcher.submit("s", ask("hi"))) == ["hi:1", "hi:2", "hi:3"]
+    assert dispatcher.stats()["completed"] == 1
+
+
+def test_concurrency_is_capped():
+    backend = StubBackend()
+    backend.release.clear()
+    dispatcher = InferenceDispatcher(backend, max_concurrency=2)
+    readers = [lambda i=i: read_all(dispatcher, f"s{i}", f"q{i}") for i in range(5)]
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(in_threads(*readers)))
+    worker.start()
+    wait_for(lambda: backend.running == 2)
+    time.sleep(0.05)
+    assert backend.running == 2 and dispatcher.stats()["queue_depth"] == 3
+    # what the metrics panel / Prometheus see while the queue is backed up
+    registry = Registry()
+    registry.collect("dispatcher", dispatcher.stats, backend="primary")
+    gauges = {r["name"]: r["value"] for r in registry.snapshot() if r["type"] == "gauge"}
+    assert gauges["dispatcher_queue_depth"] == 3 and gauges["dispatcher_running"] == 2
+    assert 'dbt_hub_dispatcher_queue_depth{backend="primary"} 3' in registry.prometheus()
+    backend.release.set()
+    worker.join(10)
+    assert results == [f"q{i}:1q{i}:2" for i in range(5)]
+    assert backend.peak == 2
+
+
+def test_sessions_are_served_round_robin():
+    backend = StubBackend()
+    backend.release.clear()
+    dispatcher = InferenceDispatcher(backend, max_concurrency=1)
+    # "busy" queues three requests before "quiet" asks once
+    readers = [dispatcher.submit("blocker", ask("first"))]
+    next_chunk = threading.Thread(target=lambda: next(readers[0]))
+    next_chunk.start()
+    wait_for(lambda: backend.running == 1)
+    readers += [dispatcher.submit("busy", ask(f"busy{i}")) for i in range(3)]
+    readers.append(dispatcher.submit("quiet", ask("quiet")))
+    backend.release.set()
+    next_chunk.join(5)
+    in_threads(*[lambda r=r: list(r) for r in readers])
+    assert backend.calls == ["first", "busy0", "quiet", "busy1", "busy2"]
+
+
+def test_identical_requests_share_one_call():
+    backend = StubBackend()
+    backend.release.clear()
+    dispatcher = InferenceDispatcher(backend)
+    first = dispatcher.submit("a", ask("same"))
+    second = dispatcher.submit("b", ask("same"))
+    backend.release.set()
+    assert in_threads(lambda: list(first), lambda: list(second)) == [["same:1", "same:2"]] * 2
+    assert backend.calls == ["same"]
+    assert dispatcher.stats()["deduplicated"] == 1
+
+
+def test_deadline_includes_queueing():
+    backend = StubBackend()
+    backend.release.clear()
+    dispatcher = InferenceDispatcher(backend, max_concurrency=1, timeout=0.2)
+    blocker = dispatcher.submit("a", ask("slow"))
+    waiting = dispatcher.submit("b", ask("queued"))
+    with pytest.raises(TimeoutError):
+        list(waiting)
+    assert dispatcher.stats()["timeouts"] == 1
+    # the reader gave up, so its request leaves the queue without ever running
+    backend.release.set()
+    with pytest.raises(TimeoutError):
+        list(blocker)
+    wait_for(lambda: dispatcher.stats()["running"] == 0)
+    assert backend.calls == ["slow"]
+    assert dispatcher.stats()["queue_depth"] == 0
+
+
+def test_a_hung_backend_call_gives_its_slot_back():
+    backend = StubBackend()
+    dispatcher = InferenceDispatcher(backend, max_concurrency=1, timeout=0.3)
+    with pytest.raises(TimeoutError):
+        list(dispatcher.submit("a", ask("hang")))
+    wait_for(lambda: dispatcher.stats()["running"] == 0)
+    assert dispatcher.stats()["abandoned"] == 1
+    # the hung call is still stuck in the backend, the next one runs anyway
+    assert read_all(dispatcher, "b", "fine") == "fine:1fine:2"
+    assert backend.running == 1
+    backend.unhang.set()
+    wait_for(lambda: backend.running == 0)
+    assert dispatcher.stats()["completed"] == 1  # the late reply went nowhere
+
+
+def test_backend_errors_reach_the_reader():
+    dispatcher = InferenceDispatcher(StubBackend())
+    with pytest.raises(RuntimeError, match="backend down"):
+        list(dispatcher.submit("s", ask("fail")))
+    assert dispatcher.stats()["failed"] == 1
+
+
+def test_walking_away_stops_the_backend_mid_stream():
+    backend = StubBackend(chunks=100, delay=0.01)
+    dispatcher = InferenceDispatcher(backend)
+    reply = dispatcher.submit("s", ask("long"))
+    assert next(reply) == "long:1"
+    reply.close()  # the chat tab went away
+    wait_for(lambda: backend.closed == 1)
+    assert backend.sent < 100
+    assert dispatcher.stats()["cancelled"] == 1
+
+
+def test_batch_requests_go_together_and_chat_streams_alone():
+    backend = StubBackend(batching=True)
+    backend.release.clear()
+    dispatcher = InferenceDispatcher(backend, max_concurrency=1, max_batch=4, batch_window=0.05)
+    blocker = dispatcher.submit("x", ask("blocker"))
+    threading.Thread(target=lambda: next(blocker)).start()
+    wait_for(lambda: backend.running == 1)
+    summaries = [dispatcher.submit(f"s{i}", ask(f"sum{i}"), batch=True) for i in range(3)]
+    chat = dispatcher.submit("c", ask("chat"))
+    backend.release.set()
+    results = in_threads(*[lambda r=r: list(r) for r in summaries], lambda: list(chat), lambda: list(blocker))
+    assert results[:3] == [[f"sum{i}:done"] for i in range(3)]
+    assert results[3] == ["chat:1", "chat:2"]
+    assert backend.calls[1:] == [("sum0", "sum1", "sum2"), "chat"]
+    assert dispatcher.stats()["batches"] == 1
+
+
+def test_no_batching_without_backend_support():
+    backend = StubBackend(batching=False)
+    dispatcher = InferenceDispatcher(backend, max_batch=4)
+    assert dispatcher.max_batch == 1
+    assert read_all(dispatcher, "s", "sum", batch=True) == "sum:1sum:2"
+    assert dispatcher.stats()["batches"] == 0
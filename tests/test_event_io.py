@@ -0,0 +1,116 @@
+"""Import/export round-trips and row errors, against a temp-file database."""
+import io
+
+import pytest
+
+from event_io import FORMATS, export_events, format_of, import_events
+from event_store import EventStore, SQLiteEventBackend
+
+EVENTS = [
+    {"id": "meeting", "title": "Team, weekly; sync", "start": "2025-03-04T13:00:00",
+     "end": "2025-03-04T14:00:00", "color": "#FF6C6C", "label": "Event", "details": "room 2\nbring notes"},
+    {"id": "holiday", "title": "Holiday", "start": "2025-03-10", "end": "2025-03-12"},
+    {"id": "entry-1", "title": "Check-in", "start": "2025-03-05T21:15:00Z", "end": "2025-03-05T21:15:00Z",
+     "color": "#FFFFFF", "label": "Entry", "className": "fc-entry-event"},
+    {"id": "group", "title": "Skills group", "start": "2025-01-08T18:30:00", "end": "2025-01-08T19:30:00",
+     "label": "therapy", "rrule": "FREQ=WEEKLY;COUNT=10", "exdate": ["20250122T183000", "20250205T183000"]},
+]
+
+
+def export(store, fmt):
+    return "".join(export_events(store, fmt))
+
+
+def as_dicts(store):
+    return sorted((e.to_dict() for e in store), key=lambda e: e["id"])
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteEventBackend(str(tmp_path / "events.db"))
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_round_trip(fmt, backend):
+    original = EventStore(events=EVENTS)
+    text = export(original, fmt)
+    store = EventStore.load(backend, "alice")
+    report = import_events(store, io.StringIO(text), fmt)
+    assert (report.imported, report.failed) == (4, 0)
+    assert as_dicts(store) == as_dicts(original)
+    # and what reached the disk reads back the same in a new session
+    assert as_dicts(EventStore.load(backend, "alice")) == as_dicts(original)
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_importing_twice_replaces_instead_of_duplicating(fmt):
+    text = export(EventStore(events=EVENTS), fmt)
+    store = EventStore()
+    import_events(store, io.BytesIO(text.encode()), fmt)
+    import_events(store, io.BytesIO(text.encode()), fmt, chunk_size=2)
+    assert len(store) == 4
+
+
+def test_ics_with_time_zones_and_folded_lines():
+    text = "\r\n".join([
+        "BEGIN:VCALENDAR", "BEGIN:VEVENT", "UID:tz", "DTSTART;TZID=America/Toronto:20250304T090000",
+        "DTEND;TZID=America/Toronto:20250304T100000",
+        "SUMMARY:A long title that goes on and on and on and on and on and on and on and o",
+        " n past the fold", "END:VEVENT", "END:VCALENDAR", ""])
+    store = EventStore()
+    import_events(store, io.StringIO(text), "ics")
+    event = store.get("tz")
+    assert event.utc and event.start.hour == 14
+    assert event.title.endswith("and on past the fold")
+
+
+def test_row_errors_are_reported_and_good_rows_still_land():
+    lines = [
+        '{"id": "ok", "start": "2025-03-04T13:00:00"}',
+        '{"id": "bad-date", "start": "March 4th"}',
+        '{"id": "backwards", "start": "2025-03-04T13:00:00", "end": "2025-03-04T12:00:00"}',
+        '{"id": "no-start", "title": "when?"}',
+        '{"id": "bad-rule", "start": "2025-03-04T13:00:00", "rrule": "FREQ=MONTHLY"}',
+        'not json',
+        '["not", "an", "object"]',
+    ]
+    store = EventStore()
+    report = import_events(store, io.StringIO("\n".join(lines)), "jsonl")
+    assert report.imported == 1 and "ok" in store
+    problems = dict(report.errors)
+    assert report.failed == 6 and sorted(problems) == [2, 3, 4, 5, 6, 7]
+    assert problems[2].startswith("bad date")
+    assert problems[3] == "ends before it starts"
+    assert problems[4] == "missing start"
+    assert "FREQ" in problems[5]
+    assert problems[6].startswith("not valid JSON")
+
+
+def test_csv_and_ics_row_numbers():
+    csv_text = "id,title,start,end\na,ok,2025-03-04T13:00:00,\nb,bad,2025-13-40,\n"
+    report = import_events(EventStore(), io.StringIO(csv_text), "csv")
+    assert report.imported == 1 and [n for n, _ in report.errors] == [3]
+    ics_text = "BEGIN:VCALENDAR\nBEGIN:VEVENT\nUID:x\nDTSTART:2025-03-04\nEND:VEVENT\nEND:VCALENDAR\n"
+    report = import_events(EventStore(), io.StringIO(ics_text), "ics")
+    assert report.failed == 1 and report.errors[0][0] == 2 and "DTSTART" in report.errors[0][1]
+
+
+def test_unknown_format():
+    assert format_of("diary.NDJSON") == "jsonl"
+    with pytest.raises(ValueError):
+        import_events(EventStore(), io.StringIO(""), "xlsx")
+
+
+def test_ids_are_scoped_per_user(backend):
+    text = export(EventStore(events=EVENTS), "jsonl")
+    for user in ("alice", "bob"):
+        import_events(EventStore.load(backend, user), io.StringIO(text), "jsonl")
+    alice = EventStore.load(backend, "alice")
+    alice.ensure()
+    alice.apply(upserts=[alice.updated("meeting", title="alice's")], deletes=["holiday"])
+    bob = EventStore.load(backend, "bob")
+    assert len(bob) == 4
+    assert {e.id: e.title for e in bob}["meeting"] == "Team, weekly; sync"
+    assert len(backend.load("alice")) == 3
@@ -0,0 +1,66 @@
+"""EventStore over a SQLite file: range loading and per-user scoping."""
+from datetime import datetime
+
+import pytest
+
+from event_store import EventStore, SQLiteEventBackend
+
+
+def event(event_id, start, end=None, **fields):
+    return {"id": event_id, "title": event_id, "start": start, **({"end": end} if end else {}), **fields}
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteEventBackend(str(tmp_path / "events.db"))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def seeded(backend):
+    backend.write_batch("alice", [
+        event("jan", "2025-01-10T10:00:00", "2025-01-10T11:00:00", label="Event"),
+        event("mar", "2025-03-10T10:00:00", "2025-03-10T11:00:00", label="URGE SPIKE"),
+        event("trip", "2024-12-20", "2025-03-05", label="Event"),  # long, starts before the window
+        event("weekly", "2024-06-03T18:00:00", "2024-06-03T19:00:00", rrule="FREQ=WEEKLY"),
+        # an occurrence dragged far away from its original date
+        event("weekly@20250303T180000", "2025-06-01T18:00:00", "2025-06-01T19:00:00"),
+    ])
+    return backend
+
+
+def test_range_query(seeded):
+    ids = {e["id"] for e in seeded.load("alice", "2025-03-01T00:00:00", "2025-04-01T00:00:00")}
+    # the series and its edited occurrences come along whatever the window
+    assert ids == {"mar", "trip", "weekly", "weekly@20250303T180000"}
+    assert len(seeded.load("alice")) == 5
+    assert seeded.load("bob") == []
+
+
+def test_store_reads_through_by_window(seeded):
+    store = EventStore.load(seeded, "alice")
+    assert len(store) == 5  # counted by the backend, nothing loaded yet
+    # the Monday 3 March occurrence was moved away, so only the long trip is left
+    assert [e.id for e in store.between(datetime(2025, 3, 1), datetime(2025, 3, 8))] == ["trip"]
+    assert "jan" not in store._by_id
+    assert [e.id for e in store.between(datetime(2025, 6, 1), datetime(2025, 6, 2))] == ["weekly@20250303T180000"]
+    assert {e.id for e in store} == {"jan", "mar", "trip", "weekly", "weekly@20250303T180000"}
+    assert "jan" in store._by_id
+
+
+def test_writes_and_labels_go_through(seeded):
+    store = EventStore.load(seeded, "alice")
+    assert store.labels() == ["Event", "URGE SPIKE"]
+    store.apply(upserts=[event("apr", "2025-04-02T09:00:00", label="therapy")], deletes=["jan"])
+    assert store.labels() == ["Event", "URGE SPIKE", "therapy"]
+    assert {e["id"] for e in seeded.load("alice")} == {"mar", "trip", "weekly", "weekly@20250303T180000", "apr"}
+    list(store)
+    assert store.labels() == ["Event", "URGE SPIKE", "therapy"]
+
+
+def test_deleting_a_series_takes_unloaded_occurrences_along(seeded):
+    store = EventStore.load(seeded, "alice")
+    store.between(datetime(2025, 1, 1), datetime(2025, 1, 31))
+    store.apply(deletes=["weekly"])
+    assert {e["id"] for e in seeded.load("alice")} == {"jan", "mar", "trip"}
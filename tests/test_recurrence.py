@@ -0,0 +1,156 @@
+"""Recurrence rules, and repeating series inside the EventStore."""
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from event_store import EventStore
+from recurrence import Rule, RuleError, occurrence_id, split_id
+
+DTSTART = datetime(2025, 1, 8, 18, 30)  # a Wednesday
+SPAN = timedelta(hours=1)
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=3;COUNT=20",
+    "FREQ=WEEKLY",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE,SA;COUNT=25",
+    "FREQ=WEEKLY;INTERVAL=3;BYDAY=TU,SU;UNTIL=20250901",
+    "FREQ=DAILY;X-ESM=3;X-WINDOW=0900-2100;X-GAP=30;COUNT=40",
+    "FREQ=WEEKLY;BYDAY=FR;X-ESM=2;X-WINDOW=1000-1200;X-GAP=60;UNTIL=20250601T120000",
+]
+
+
+def brute_force(rule: Rule, start: datetime, end: datetime, seed: str) -> list:
+    """Walk every day from DTSTART on, the slow obvious way"""
+    byday = rule.byday or ((DTSTART.weekday(),) if rule.freq == "WEEKLY" else ())
+    monday = DTSTART.date() - timedelta(days=DTSTART.weekday())
+    found, index, day = [], 0, DTSTART.date()
+    while day <= end.date():
+        if rule.freq == "DAILY":
+            matches = (day - DTSTART.date()).days % rule.interval == 0
+        else:
+            matches = (day - monday).days // 7 % rule.interval == 0 and day.weekday() in byday
+        if matches:
+            for t in rule._times(day.toordinal(), DTSTART, seed):
+                if rule.count is not None and index >= rule.count:
+                    return found
+                index += 1
+                occurrence = datetime.combine(day, t)
+                if rule.until is not None and occurrence > rule.until:
+                    return found
+                if occurrence < end and occurrence + SPAN >= start:
+                    found.append(occurrence)
+        day += timedelta(days=1)
+    return found
+
+
+@pytest.mark.parametrize("text", RULES)
+def test_str_round_trips(text):
+    rule = Rule.parse(text)
+    assert str(Rule.parse(str(rule))) == str(rule)
+
+
+@pytest.mark.parametrize("text", RULES)
+def test_starts_match_brute_force(text):
+    rule = Rule.parse(text)
+    rng = random.Random(text)
+    windows = [(datetime(2025, 1, 1), datetime(2026, 1, 1))]
+    for _ in range(30):
+        start = datetime(2024, 12, 1) + timedelta(hours=rng.randrange(24 * 400))
+        windows.append((start, start + timedelta(days=rng.choice([1, 7, 42]))))
+    for start, end in windows:
+        assert rule.starts(DTSTART, SPAN, start, end, seed="s") == brute_force(rule, start, end, "s"), (start, end)
+
+
+def test_count_carries_across_windows():
+    rule = Rule.parse("FREQ=WEEKLY;BYDAY=MO,TH;COUNT=10")
+    first = rule.starts(DTSTART, SPAN, datetime(2025, 1, 1), datetime(2025, 1, 20))
+    later = rule.starts(DTSTART, SPAN, datetime(2025, 1, 20), datetime(2025, 6, 1))
+    assert len(first) + len(later) == 10
+    assert later[-1].date() == date(2025, 2, 10)
+
+
+def test_esm_prompts_are_stable_and_spaced():
+    rule = Rule.parse("FREQ=DAILY;X-ESM=4;X-WINDOW=0900-1700;X-GAP=45")
+    day = (datetime(2025, 3, 1), datetime(2025, 3, 2))
+    prompts = rule.starts(DTSTART, SPAN, *day, seed="esm")
+    assert prompts == rule.starts(DTSTART, SPAN, *day, seed="esm")
+    assert len(prompts) == 4 and time(9) <= prompts[0].time() and prompts[-1].time() <= time(17)
+    assert all(b - a >= timedelta(minutes=45) for a, b in zip(prompts, prompts[1:]))
+
+
+@pytest.mark.parametrize("text", [
+    "FREQ=MONTHLY", "FREQ=DAILY;BYDAY=MO", "FREQ=WEEKLY;BYMONTH=3", "FREQ=DAILY;COUNT=0",
+    "FREQ=DAILY;X-ESM=10;X-WINDOW=0900-1000;X-GAP=30", "FREQ=DAILY;UNTIL=soon", "nonsense",
+])
+def test_bad_rules_are_refused(text):
+    with pytest.raises(RuleError):
+        Rule.parse(text)
+
+
+def test_occurrence_ids():
+    assert occurrence_id("abc", datetime(2025, 1, 8, 18, 30)) == "abc@20250108T183000"
+    assert split_id("abc@20250108T183000") == ("abc", datetime(2025, 1, 8, 18, 30))
+    assert split_id("someone@example.com") is None
+    assert split_id(None) is None
+
+
+# ---- series in the store ----
+
+def weekly_store():
+    store = EventStore()
+    store.apply(upserts=[{"id": "group", "title": "Skills group", "start": "2025-01-08T18:30:00",
+                          "end": "2025-01-08T19:30:00", "rrule": "FREQ=WEEKLY;COUNT=10"},
+                         {"id": "single", "title": "Dentist", "start": "2025-01-15T09:00:00"}])
+    return store
+
+
+def shown(store, start=datetime(2025, 1, 1), end=datetime(2025, 4, 1)):
+    return [(e.id, e.title, e.start) for e in store.between(start, end)]
+
+
+def test_series_expands_in_windows():
+    store = weekly_store()
+    events = shown(store)
+    assert len(events) == 11
+    assert events[0] == ("group@20250108T183000", "Skills group", datetime(2025, 1, 8, 18, 30))
+    assert store.get("group@20250122T183000").start == datetime(2025, 1, 22, 18, 30)
+    assert "group@20250123T183000" not in store
+
+
+def test_edited_occurrence_replaces_the_generated_one():
+    store = weekly_store()
+    occurrence = "group@20250122T183000"
+    moved = store.updated(occurrence, title="Moved", start=datetime(2025, 1, 24, 10), end=datetime(2025, 1, 24, 11))
+    store.apply(upserts=[moved])
+    events = shown(store)
+    assert len(events) == 11
+    assert [e for e in events if e[0] == occurrence] == [(occurrence, "Moved", datetime(2025, 1, 24, 10))]
+    assert store.series_of(occurrence) == "group"
+
+
+def test_deleting_an_occurrence_adds_an_exdate():
+    store = weekly_store()
+    store.apply(deletes=["group@20250122T183000"])
+    assert store.get("group").extra["exdate"] == ["20250122T183000"]
+    assert "group@20250122T183000" not in [e[0] for e in shown(store)]
+    assert len(shown(store)) == 10  # COUNT still counts the deleted one
+
+
+def test_deleting_the_series_takes_edited_occurrences_along():
+    store = weekly_store()
+    store.apply(upserts=[store.updated("group@20250122T183000", title="Moved")])
+    store.apply(deletes=["group"])
+    assert [e[0] for e in shown(store)] == ["single"]
+    assert len(store) == 1
+
+
+def test_bulk_replacing_a_series_forgets_its_rule():
+    store = weekly_store()
+    shown(store)  # memoize a window
+    plain = [{"id": f"e{i}", "start": f"2025-02-{1 + i % 28:02d}T08:00:00"} for i in range(70)]
+    store.apply(upserts=plain + [{"id": "group", "title": "No longer repeats", "start": "2025-01-08T18:30:00"}])
+    events = shown(store)
+    assert len(events) == 72
+    assert ("group", "No longer repeats", datetime(2025, 1, 8, 18, 30)) in events
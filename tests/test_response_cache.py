@@ -0,0 +1,88 @@
+"""Which prompts may be answered from the shared cache, and the cache itself."""
+import pytest
+
+from metrics import Registry
+from response_cache import ResponseCache, caching, is_general_question, make_key
+
+
+@pytest.mark.parametrize("prompt", [
+    "What is TIPP?",
+    "explain opposite action",
+    "how do I use wise mind",
+    "whats DEAR MAN",
+    "define radical acceptance",
+])
+def test_skill_questions_are_general(prompt):
+    assert is_general_question(prompt)
+
+
+@pytest.mark.parametrize("prompt", [
+    # pointing back into the chat
+    "explain that again",
+    "what does that mean",
+    "what is the second one?",
+    "what are those",
+    "describe it",
+    # about other people
+    "describe how he treated you",
+    "what is wrong with him",
+    "what does she want from them",
+    # about the person asking
+    "what is wrong with me",
+    "explain why I feel this way",
+    "tell me about my week",
+    # not a question about a skill at all
+    "I had a hard day",
+])
+def test_personal_and_history_questions_are_not(prompt):
+    assert not is_general_question(prompt)
+
+
+def test_key_ignores_case_and_punctuation():
+    assert make_key("What is TIPP?") == make_key("what is tipp")
+
+
+def test_lru_eviction_by_size():
+    cache = ResponseCache(max_bytes=60)
+    cache.put("a", "x" * 20)
+    cache.put("b", "x" * 20)
+    cache.get("a")  # now b is the least recently used
+    cache.put("c", "x" * 20)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("response_cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.put("k", "reply")
+    assert cache.get("k") == "reply"
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_stats_reach_the_metrics_registry():
+    cache = ResponseCache()
+    registry = Registry()
+    registry.collect("response_cache", cache.stats)
+    cache.put("k", "reply")
+    cache.get("k"), cache.get("other")
+    gauges = {r["name"]: r["value"] for r in registry.snapshot() if r["type"] == "gauge"}
+    assert (gauges["response_cache_hits"], gauges["response_cache_misses"]) == (1, 1)
+    assert gauges["response_cache_hit_rate"] == 0.5 and gauges["response_cache_entries"] == 1
+
+
+def test_caching_stores_only_finished_replies():
+    cache = ResponseCache()
+
+    def broken():
+        yield "half"
+        raise RuntimeError("stream died")
+    with pytest.raises(RuntimeError):
+        list(caching(broken(), cache, "k"))
+    assert cache.get("k") is None
+    assert list(caching(iter(["a", "b"]), cache, "k")) == ["a", "b"]
+    assert cache.get("k") == "ab"